@@ -23,6 +23,7 @@ if FILENAME not in project_dir_content:
         f'Убедитесь, что у вас верная структура проекта.'
     )
 
+import pytest
 from django.utils.version import get_version
 
 assert get_version() < '3.0.0', 'Пожалуйста, используйте версию Django < 3.0.0'
@@ -37,3 +38,10 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def inline_thumbnails(settings):
+    # Пул потоков дописывал бы миниатюры во временный MEDIA_ROOT теста
+    # уже во время его удаления, поэтому строим их сразу после записи.
+    settings.THUMBNAIL_WORKERS = 0
@@ -0,0 +1,128 @@
+"""Версионированный кеш страниц.
+
+Каждая область данных (весь сайт, группа, автор, пост) имеет счётчик
+поколений. Счётчики входят в ключ кеша страницы, поэтому изменение
+данных делает старые записи недостижимыми без явного удаления.
+Поколение - время последнего изменения области в наносекундах, из него
+же строится ETag для условных запросов.
+
+Счётчики хранятся в кеше default, и сразу устаревают страницы только
+при общем для всех процессов кеше (SHARED_CACHE). С LocMemCache у
+каждого воркера свои счётчики, поэтому TIME_OF_CACHE там короткий.
+"""
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.views.decorators.cache import cache_page
+
+GENERATION_KEY = "generation:{}"
+
+
+def _initial_generation():
+    # Вытесненный из кеша счётчик не должен начать заново с 1 и совпасть
+    # с поколением, под которым уже лежит устаревшая страница.
+    return time.time_ns()
+
+
+def get_generations(scopes):
+    """Возвращает текущие поколения областей одним запросом к кешу."""
+    keys = [GENERATION_KEY.format(scope) for scope in scopes]
+    found = cache.get_many(keys)
+    missing = {
+        key: _initial_generation() for key in keys if key not in found
+    }
+    if missing:
+        for key, value in missing.items():
+            cache.add(key, value, timeout=None)
+        found.update(cache.get_many(list(missing)))
+    return [found.get(key, missing.get(key)) for key in keys]
+
+
+def bump_generations(scopes):
+    """Сдвигает поколения областей, инвалидируя зависящие страницы.
+
+    Новое поколение - текущее время, но не меньше прежнего плюс один.
+    """
+    keys = [GENERATION_KEY.format(scope) for scope in set(scopes)]
+    now = _initial_generation()
+    current = cache.get_many(keys)
+    cache.set_many(
+        {key: max(now, current.get(key, 0) + 1) for key in keys},
+        timeout=None,
+    )
+
+
+def _request_generations(request, scopes, args, kwargs):
+    # Декораторы одной страницы спрашивают одни и те же поколения,
+    # а области поста узнаются запросом к БД.
+    memo = request.__dict__.setdefault("_generations", {})
+    if scopes not in memo:
+        memo[scopes] = get_generations(scopes(request, *args, **kwargs))
+    return memo[scopes]
+
+
+def versioned_cache_page(timeout, scopes, key_prefix):
+    """Аналог cache_page, ключ которого включает поколения областей.
+
+    scopes вызывается с аргументами view и возвращает список областей.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            generations = _request_generations(request, scopes, args, kwargs)
+            prefix = ".".join(
+                [key_prefix] + [str(value) for value in generations]
+            )
+            cached_view = cache_page(timeout, key_prefix=prefix)(view_func)
+            return cached_view(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def conditional_page(scopes):
+    """Отвечает 304, если данные страницы не менялись.
+
+    Валидаторы строятся из поколений областей до вызова view, без
+    отрисовки и без запросов к БД сверх scopes. Страница зависит
+    от пользователя и содержит его CSRF-токен, поэтому оба входят
+    в ETag: после повторного входа токен меняется, и старая страница
+    с ним не годится. Last-Modified не отдаётся: в секундах он не
+    различает изменения в пределах одной секунды. Браузер обязан
+    перепроверять страницу при каждом показе: иначе он держал бы её
+    весь срок кеша сервера.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD"):
+                return view_func(request, *args, **kwargs)
+            generations = _request_generations(request, scopes, args, kwargs)
+            # CsrfViewMiddleware кладёт сюда токен из cookie или сессии.
+            raw = "|".join(
+                [
+                    str(request.user.pk or ""),
+                    request.META.get("CSRF_COOKIE", ""),
+                    request.get_full_path(),
+                ]
+                + [str(value) for value in generations]
+            )
+            etag = f'W/"{hashlib.md5(raw.encode()).hexdigest()}"'
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = view_func(request, *args, **kwargs)
+            response.setdefault("ETag", etag)
+            patch_cache_control(
+                response, max_age=0, no_cache=True, private=True
+            )
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,144 @@
+"""Чтение лент с реплики и запись в основную базу.
+
+Реплика подключается псевдонимом REPLICA в DATABASES. Чтения идут
+на неё только внутри view, обёрнутых read_from_replica, остальное
+(сессии, авторизация, формы) читается из основной базы. Реплика
+отстаёт, поэтому после записи клиент на REPLICA_STICKY_SECONDS
+закрепляется за основной базой cookie, а страницы, области которых
+менялись за это же время, читаются оттуда для всех.
+"""
+import contextvars
+import sqlite3
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from .cache import _request_generations
+
+REPLICA = "replica"
+PIN_COOKIE = "primary_pin"
+
+_use_replica = contextvars.ContextVar("use_replica", default=False)
+
+
+def replica_configured():
+    return REPLICA in connections.databases
+
+
+@contextmanager
+def use_replica():
+    token = _use_replica.set(True)
+    try:
+        yield
+    finally:
+        _use_replica.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if _use_replica.get() and replica_configured():
+            return REPLICA
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплика - копия основной базы, объекты из них сравнимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема реплики приходит вместе с копией данных.
+        return db != REPLICA
+
+
+def _recently_changed(generations):
+    threshold = time.time_ns() - settings.REPLICA_STICKY_SECONDS * 10 ** 9
+    return any(value > threshold for value in generations)
+
+
+def read_from_replica(scopes=None):
+    """Выполняет view с чтением из реплики, если ей можно доверять.
+
+    Основная база остаётся за клиентом с cookie закрепления и за
+    страницами, поколение областей scopes которых моложе
+    REPLICA_STICKY_SECONDS.
+    """
+
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ("GET", "HEAD") or (
+                PIN_COOKIE in request.COOKIES
+            ):
+                return view_func(request, *args, **kwargs)
+            if scopes is not None and _recently_changed(
+                _request_generations(request, scopes, args, kwargs)
+            ):
+                return view_func(request, *args, **kwargs)
+            # Сессия и пользователь читаются из основной базы до того,
+            # как view начнёт читать из реплики.
+            if hasattr(request, "user"):
+                request.user.is_authenticated
+            with use_replica():
+                return view_func(request, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+class _WriteDetector:
+    def __init__(self):
+        self.wrote = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if sql.lstrip()[:6].upper() != "SELECT":
+            self.wrote = True
+        return execute(sql, params, many, context)
+
+
+class PrimaryPinMiddleware:
+    """Закрепляет клиента за основной базой после его записи.
+
+    Запись распознаётся по самим SQL-запросам, а не по методу:
+    подписка и удаление поста в приложении делаются через GET.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_configured():
+            return self.get_response(request)
+        detector = _WriteDetector()
+        with connections[DEFAULT_DB_ALIAS].execute_wrapper(detector):
+            response = self.get_response(request)
+        if detector.wrote:
+            response.set_cookie(
+                PIN_COOKIE,
+                "1",
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+
+def sync_replica(source=DEFAULT_DB_ALIAS, target=REPLICA):
+    """Копирует SQLite-базу source в файл реплики через backup API."""
+    primary = connections[source]
+    if primary.vendor != "sqlite":
+        raise ValueError("Копирование поддерживается только для SQLite")
+    primary.ensure_connection()
+    name = connections.databases[target]["NAME"]
+    # Открытое соединение реплики держало бы старый снимок.
+    connections[target].close()
+    replica = sqlite3.connect(name, uri=name.startswith("file:"))
+    try:
+        primary.connection.backup(replica)
+    finally:
+        replica.close()
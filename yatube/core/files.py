@@ -0,0 +1,168 @@
+"""Отдача статики и загрузок без DEBUG.
+
+Файлы с хешем содержимого в имени (core.storage, миниатюры sorl)
+отдаются с Cache-Control immutable на год, остальные браузер
+перепроверяет по ETag и Last-Modified. Поддерживаются запросы
+диапазона (Range, If-Range), а при FILE_OFFLOAD сами байты отдаёт
+веб-сервер по X-Accel-Redirect (nginx) или X-Sendfile (Apache).
+"""
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import (
+    FileResponse,
+    Http404,
+    HttpResponse,
+    StreamingHttpResponse,
+)
+from django.urls import re_path
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views.decorators.http import require_safe
+
+from .storage import HASH_LENGTH
+
+IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+CHUNK_SIZE = 64 * 1024
+# Имя с хешем: photo.<12 знаков>.jpg из core.storage и collectstatic
+# (у повторных загрузок ещё суффикс _AbC1234) или <32 знака>.jpg
+# миниатюр sorl.
+HASHED_NAME = re.compile(
+    rf"(?:\.[0-9a-f]{{{HASH_LENGTH}}}(?:_[a-zA-Z0-9]{{7}})?"
+    rf"|(?:^|/)[0-9a-f]{{32}})\.\w+$"
+)
+RANGE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def roots():
+    return {"static": settings.STATIC_ROOT, "media": settings.MEDIA_ROOT}
+
+
+def parse_range(header, size):
+    """(начало, конец) включительно, None без диапазона, ValueError - 416.
+
+    Несколько диапазонов через запятую не поддерживаются: на них
+    отдаётся весь файл, как разрешает RFC 7233.
+    """
+    match = RANGE.match(header.replace(" ", ""))
+    if not match:
+        return None
+    first, last = match.groups()
+    if not first:
+        if not last or not int(last):
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        raise ValueError(header)
+    return start, end
+
+
+def _read_range(path, start, length):
+    with open(path, "rb") as file:
+        file.seek(start)
+        while length > 0:
+            chunk = file.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                return
+            length -= len(chunk)
+            yield chunk
+
+
+def _offload(kind, path, relative):
+    response = HttpResponse()
+    if settings.FILE_OFFLOAD == "x-accel-redirect":
+        prefix = settings.FILE_OFFLOAD_PREFIXES[kind]
+        response["X-Accel-Redirect"] = prefix + quote(relative)
+    else:
+        response["X-Sendfile"] = path
+    # Тип, длину и диапазоны ставит веб-сервер.
+    del response["Content-Type"]
+    return response
+
+
+def _file_response(request, path, size, etag):
+    content_type, encoding = mimetypes.guess_type(path)
+    content_type = content_type or "application/octet-stream"
+    byte_range = None
+    header = request.META.get("HTTP_RANGE")
+    # If-Range: диапазон только для той же версии файла, иначе целиком.
+    if header and request.META.get("HTTP_IF_RANGE", etag) == etag:
+        try:
+            byte_range = parse_range(header, size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+    if byte_range is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+        response["Content-Length"] = size
+    else:
+        start, end = byte_range
+        response = StreamingHttpResponse(
+            _read_range(path, start, end - start + 1),
+            status=206,
+            content_type=content_type,
+        )
+        response["Content-Range"] = f"bytes {start}-{end}/{size}"
+        response["Content-Length"] = end - start + 1
+    if encoding:
+        response["Content-Encoding"] = encoding
+    response["Accept-Ranges"] = "bytes"
+    return response
+
+
+@require_safe
+def serve(request, path, kind):
+    try:
+        full_path = safe_join(roots()[kind], path)
+    except (KeyError, SuspiciousFileOperation, TypeError):
+        # TypeError: корень не настроен (STATIC_ROOT = None).
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+    stat = os.stat(full_path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    response = get_conditional_response(
+        request, etag=etag, last_modified=int(stat.st_mtime)
+    )
+    if response is None:
+        if settings.FILE_OFFLOAD:
+            response = _offload(kind, full_path, path)
+        else:
+            response = _file_response(request, full_path, stat.st_size, etag)
+    if response.status_code == 416:
+        return response
+    response["ETag"] = etag
+    response["Last-Modified"] = http_date(stat.st_mtime)
+    if HASHED_NAME.search(path):
+        patch_cache_control(
+            response, public=True, max_age=IMMUTABLE_MAX_AGE, immutable=True
+        )
+    else:
+        patch_cache_control(response, public=True, no_cache=True)
+    return response
+
+
+def urlpatterns():
+    """Адреса отдачи для локальных STATIC_URL и MEDIA_URL."""
+    patterns = []
+    for kind, url in (
+        ("static", settings.STATIC_URL),
+        ("media", settings.MEDIA_URL),
+    ):
+        if url and url.startswith("/") and not url.startswith("//"):
+            patterns.append(
+                re_path(
+                    rf"^{re.escape(url.lstrip('/'))}(?P<path>.*)$",
+                    serve,
+                    {"kind": kind},
+                )
+            )
+    return patterns
@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import REPLICA, replica_configured, sync_replica
+
+
+class Command(BaseCommand):
+    help = (
+        "Копирует основную базу SQLite в файл реплики через backup API. "
+        "С --interval повторяет копирование, пока команду не остановят"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=0,
+            help="Пауза между копиями в секундах (0 - скопировать раз)",
+        )
+
+    def handle(self, *args, **options):
+        if not replica_configured():
+            raise CommandError(
+                f"В DATABASES нет псевдонима {REPLICA}: "
+                "задайте YATUBE_REPLICA_DB"
+            )
+        while True:
+            start = time.perf_counter()
+            try:
+                sync_replica()
+            except ValueError as error:
+                raise CommandError(error)
+            self.stdout.write(
+                f"Реплика обновлена за {time.perf_counter() - start:.2f} с"
+            )
+            if not options["interval"]:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,28 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.warmup import warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Компилирует шаблоны и замеряет время прогрева. Первые страницы "
+        "ленты кладутся в кеш только при общем кеше (SHARED_CACHE): "
+        "LocMemCache пропал бы вместе с процессом команды. Память "
+        "воркеров греет wsgi.py при WARMUP_ON_START"
+    )
+
+    def handle(self, *args, **options):
+        report = warm_up(prime=settings.SHARED_CACHE)
+        if not settings.SHARED_CACHE:
+            self.stdout.write("Кеш локальный: страницы не запрашивались")
+        for url, status in report["pages"].items():
+            self.stdout.write(f"{status}  {url}")
+        loader = "да" if report["cached_loader"] else "нет"
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Шаблонов: {report['templates']} (кеширующий загрузчик: "
+                f"{loader}), страниц: {len(report['pages'])}, "
+                f"за {report['seconds']:.2f} с"
+            )
+        )
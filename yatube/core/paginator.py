@@ -0,0 +1,214 @@
+import base64
+import binascii
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+COUNT_KEY = "paginator_count:{}"
+
+
+class CursorPaginator(Paginator):
+    """Пагинация по ключу (pub_date, id) без OFFSET и COUNT(*).
+
+    Вместо номера страницы клиент получает непрозрачный курсор,
+    указывающий на первую или последнюю запись соседней страницы.
+    keys задаёт поля ключа: дату и целочисленный разделитель равных дат.
+    """
+
+    cursor_mode = True
+
+    def __init__(
+        self, object_list, per_page, descending=True, keys=("pub_date", "pk")
+    ):
+        super().__init__(object_list, per_page)
+        self.descending = descending
+        self.keys = keys
+        self.next_cursor = None
+        self.previous_cursor = None
+
+    def dump_key(self, value):
+        """Первое поле ключа в строку курсора."""
+        return value.isoformat()
+
+    def load_key(self, raw):
+        """Первое поле ключа из строки курсора; None, если не разобрать."""
+        return parse_datetime(raw)
+
+    def encode_cursor(self, direction, obj):
+        # Строки .values() приходят словарями, остальное - объектами.
+        date_key, id_key = self.keys
+        if isinstance(obj, dict):
+            date, pk = obj[date_key], obj[id_key]
+        else:
+            date, pk = getattr(obj, date_key), getattr(obj, id_key)
+        raw = f"{direction}|{self.dump_key(date)}|{pk}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor):
+        """Разбирает курсор в (direction, pub_date, pk) или возвращает None."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            raw = base64.urlsafe_b64decode(padded.encode()).decode()
+            direction, pub_date, pk = raw.split("|")
+            pub_date = self.load_key(pub_date)
+            pk = int(pk)
+        except (binascii.Error, UnicodeError, ValueError):
+            return None
+        if direction not in ("n", "p") or pub_date is None:
+            return None
+        return direction, pub_date, pk
+
+    def _keyset_filter(self, forward, pub_date, pk):
+        # Записи "после" курсора в порядке выдачи ленты. Нестрогое
+        # условие на дату вынесено наружу, чтобы SQLite искал диапазоном
+        # по индексу, а не сканировал его с начала.
+        date_key, id_key = self.keys
+        lookup = "lt" if forward == self.descending else "gt"
+        return Q(**{f"{date_key}__{lookup}e": pub_date}) & (
+            Q(**{f"{date_key}__{lookup}": pub_date})
+            | Q(**{f"{id_key}__{lookup}": pk})
+        )
+
+    def _ordering(self, forward):
+        if forward == self.descending:
+            return tuple(f"-{key}" for key in self.keys)
+        return self.keys
+
+    def page_queryset(self, decoded=None):
+        """Запрос страницы по разобранному курсору, ещё не выполненный.
+
+        Берётся на одну запись больше, чтобы узнать, есть ли продолжение.
+        """
+        forward = decoded is None or decoded[0] == "n"
+        queryset = self.object_list
+        if decoded is not None:
+            _, pub_date, pk = decoded
+            queryset = queryset.filter(
+                self._keyset_filter(forward, pub_date, pk)
+            )
+        return queryset.order_by(*self._ordering(forward))[: self.per_page + 1]
+
+    def get_cursor_page(self, cursor=None):
+        """Возвращает страницу по курсору; плохой курсор ведёт на первую."""
+        decoded = self.decode_cursor(cursor) if cursor else None
+        forward = decoded is None or decoded[0] == "n"
+        rows = list(self.page_queryset(decoded))
+        has_more = len(rows) > self.per_page
+        rows = rows[: self.per_page]
+        if not forward:
+            rows.reverse()
+        if rows:
+            if forward:
+                has_next, has_previous = has_more, decoded is not None
+            else:
+                has_next, has_previous = True, has_more
+            if has_next:
+                self.next_cursor = self.encode_cursor("n", rows[-1])
+            if has_previous:
+                self.previous_cursor = self.encode_cursor("p", rows[0])
+        return Page(rows, 1, self)
+
+
+def estimate_count(queryset):
+    """Оценка числа строк таблицы по статистике СУБД.
+
+    Годится только для запроса без условий; возвращает None, если
+    оценки нет (другая СУБД, таблица не проанализирована).
+    """
+    query = queryset.query
+    if query.where or query.distinct or query.low_mark or query.high_mark:
+        return None
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    if connection.vendor == "postgresql":
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass"
+    elif connection.vendor == "sqlite":
+        # Первое число в stat - строк в таблице; строки пишет ANALYZE.
+        sql = "SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1"
+    else:
+        return None
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, [table])
+            row = cursor.fetchone()
+    except Exception:
+        # В SQLite без ANALYZE таблицы sqlite_stat1 просто нет.
+        return None
+    if row is None:
+        return None
+    estimate = int(str(row[0]).split()[0])
+    return estimate if estimate >= 0 else None
+
+
+class WindowPage(Page):
+    @property
+    def page_window(self):
+        return self.paginator.page_window(self.number)
+
+
+class CachedCountPaginator(Paginator):
+    """Постраничная выдача по номеру с кешированным числом записей.
+
+    Число записей ленты лежит в кеше под count_key; для больших таблиц
+    без условий вместо COUNT(*) берётся оценка из статистики СУБД.
+    Шаблону отдаётся не весь page_range, а окно номеров вокруг текущей
+    страницы с первой и последней (page_window, пропуски - None).
+    """
+
+    on_each_side = 2
+    on_ends = 1
+
+    def __init__(self, object_list, per_page, count_key=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_key = count_key
+        self.approximate = False
+
+    @cached_property
+    def count(self):
+        if self.count_key is None:
+            count, self.approximate = self.fetch_count()
+            return count
+        key = COUNT_KEY.format(self.count_key)
+        cached = cache.get(key)
+        if cached is None:
+            cached = self.fetch_count()
+            cache.set(key, cached, settings.PAGINATOR_COUNT_TIMEOUT)
+        count, self.approximate = cached
+        return count
+
+    def fetch_count(self):
+        """Возвращает (число записей, приближённое ли оно)."""
+        if not hasattr(self.object_list, "query"):
+            return len(self.object_list), False
+        estimate = estimate_count(self.object_list)
+        if estimate is not None and (
+            estimate >= settings.APPROXIMATE_COUNT_THRESHOLD
+        ):
+            return estimate, True
+        return self.object_list.count(), False
+
+    def page_window(self, number):
+        """Номера страниц вокруг number, первые и последние on_ends."""
+        last = self.num_pages
+        if last <= (self.on_each_side + self.on_ends) * 2 + 1:
+            return list(self.page_range)
+        window = []
+        if number > self.on_each_side + self.on_ends + 1:
+            window += list(range(1, self.on_ends + 1)) + [None]
+            start = number - self.on_each_side
+        else:
+            start = 1
+        if number < last - self.on_each_side - self.on_ends:
+            end = number + self.on_each_side
+            tail = [None] + list(range(last - self.on_ends + 1, last + 1))
+        else:
+            end, tail = last, []
+        return window + list(range(start, end + 1)) + tail
+
+    def _get_page(self, *args, **kwargs):
+        return WindowPage(*args, **kwargs)
@@ -0,0 +1,76 @@
+"""Хранилища с хешем содержимого в именах файлов.
+
+Имя меняется вместе с содержимым, поэтому по одному адресу всегда
+отдаётся один и тот же файл и браузеры с прокси могут хранить его
+сколько угодно (см. core.files).
+"""
+import hashlib
+import os
+import re
+
+from django.contrib.staticfiles.storage import (
+    ManifestStaticFilesStorage,
+    StaticFilesStorage,
+)
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_LENGTH = 12
+# Хеш и необязательный суффикс get_available_name: .<хеш>_AbC1234
+HASH_SUFFIX = re.compile(
+    rf"\.[0-9a-f]{{{HASH_LENGTH}}}(?:_[a-zA-Z0-9]{{7}})?$"
+)
+
+
+class HashedStaticStorage(ManifestStaticFilesStorage):
+    """Статика с хешем в имени после collectstatic.
+
+    Пока статика не собрана (разработка, тесты), адреса остаются
+    без хеша, вместо ошибки об отсутствии файла в манифесте.
+    """
+
+    manifest_strict = False
+
+    def url(self, name, force=False):
+        try:
+            return super().url(name, force)
+        except ValueError:
+            return StaticFilesStorage.url(self, name)
+
+
+class HashedMediaStorage(FileSystemStorage):
+    """Загрузки с хешем содержимого в имени: posts/photo.<хеш>.jpg.
+
+    Одинаковые файлы не объединяются: повторная загрузка получает
+    свободное имя с суффиксом от get_available_name. Иначе удаление
+    файла одного поста могло бы задеть пост, только что получивший
+    то же имя.
+    """
+
+    def file_hash(self, content):
+        md5 = hashlib.md5()
+        for chunk in content.chunks():
+            md5.update(chunk)
+        return md5.hexdigest()[:HASH_LENGTH]
+
+    def hashed_name(self, name, content, max_length=None):
+        directory, filename = os.path.split(name)
+        root, ext = os.path.splitext(filename)
+        # Производный файл (например, перекодированная картинка)
+        # получает свой хеш вместо хеша исходника.
+        root = HASH_SUFFIX.sub("", root)
+        suffix = f".{self.file_hash(content)}{ext}"
+        if max_length is not None:
+            # Обрезается исходное имя, а не хеш, как сделал бы
+            # get_available_name.
+            room = max_length - len(os.path.join(directory, suffix))
+            root = root[: max(room, 1)]
+        return os.path.join(directory, root + suffix)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, "chunks"):
+            content = File(content, name)
+        name = self.hashed_name(name, content, max_length)
+        return super().save(name, content, max_length)
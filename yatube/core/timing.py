@@ -0,0 +1,181 @@
+"""Замеры запроса для заголовка Server-Timing и журнала.
+
+Middleware считает SQL-запросы и их время, время отрисовки шаблонов,
+попадания и промахи кеша и общее время ответа. Замеряется только доля
+запросов SERVER_TIMING_SAMPLE_RATE, у остальных накладные расходы -
+одна проверка переменной контекста в обёртках шаблонов и кеша.
+"""
+import contextvars
+import json
+import logging
+import random
+import time
+from contextlib import ExitStack
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+_metrics = contextvars.ContextVar("request_metrics", default=None)
+_MISSING = object()
+_instrumented = set()
+
+
+class Metrics:
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # BaseCache.get_many зовёт get на каждый ключ: считается только
+        # внешний вызов.
+        self.cache_depth = 0
+
+    def record_cache(self, hits, misses):
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+    def sql(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries += 1
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        metrics = _metrics.get()
+        if metrics is None:
+            return render(self, *args, **kwargs)
+        # Вложенные шаблоны (фрагменты постов) уже входят во внешний.
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        metrics = _metrics.get()
+        if metrics is None or metrics.cache_depth:
+            return get(self, key, default, version)
+        metrics.cache_depth += 1
+        try:
+            value = get(self, key, _MISSING, version)
+        finally:
+            metrics.cache_depth -= 1
+        if value is _MISSING:
+            metrics.record_cache(0, 1)
+            return default
+        metrics.record_cache(1, 0)
+        return value
+
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        metrics = _metrics.get()
+        if metrics is None or metrics.cache_depth:
+            return get_many(self, keys, version)
+        keys = list(keys)
+        metrics.cache_depth += 1
+        try:
+            found = get_many(self, keys, version)
+        finally:
+            metrics.cache_depth -= 1
+        metrics.record_cache(len(found), len(keys) - len(found))
+        return found
+
+    return wrapper
+
+
+def instrument():
+    """Оборачивает отрисовку шаблонов и чтение настроенных кешей.
+
+    Обёртки ставятся на классы один раз за процесс.
+    """
+    targets = [(Template, "render", _timed_render)]
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        targets.append((backend, "get", _counted_get))
+        targets.append((backend, "get_many", _counted_get_many))
+    for cls, name, wrap in targets:
+        if (cls, name) in _instrumented:
+            continue
+        setattr(cls, name, wrap(getattr(cls, name)))
+        _instrumented.add((cls, name))
+
+
+def server_timing(metrics, total):
+    return ", ".join(
+        [
+            f"db;dur={metrics.db_time * 1000:.1f};"
+            f'desc="{metrics.queries} SQL"',
+            f"tpl;dur={metrics.template_time * 1000:.1f}",
+            f'cache;desc="hit {metrics.cache_hits}, '
+            f'miss {metrics.cache_misses}"',
+            f"total;dur={total * 1000:.1f}",
+        ]
+    )
+
+
+class ServerTimingMiddleware:
+    """Заголовок Server-Timing и строка журнала для доли запросов."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument()
+
+    def __call__(self, request):
+        rate = getattr(settings, "SERVER_TIMING_SAMPLE_RATE", 0)
+        if not rate or random.random() >= rate:
+            return self.get_response(request)
+        metrics = Metrics()
+        token = _metrics.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.sql)
+                    )
+                response = self.get_response(request)
+        finally:
+            _metrics.reset(token)
+        total = time.perf_counter() - start
+        response["Server-Timing"] = server_timing(metrics, total)
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "total_ms": round(total * 1000, 1),
+                    "db_queries": metrics.queries,
+                    "db_ms": round(metrics.db_time * 1000, 1),
+                    "template_ms": round(metrics.template_time * 1000, 1),
+                    "cache_hits": metrics.cache_hits,
+                    "cache_misses": metrics.cache_misses,
+                },
+                ensure_ascii=False,
+            )
+        )
+        return response
@@ -0,0 +1,121 @@
+"""Прогрев воркера после запуска.
+
+Компилирует все шаблоны проекта (с кеширующим загрузчиком они так
+и остаются в памяти), разбирает URLconf, поднимает sorl-thumbnail
+и кладёт в кеш страницы из WARMUP_URLS, чтобы первые посетители
+не платили за холодный старт.
+"""
+import logging
+import os
+import sys
+import time
+from io import BytesIO
+from urllib.parse import urlsplit
+
+from django.apps import apps
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+from django.template import engines
+from django.template.loaders.cached import Loader as CachedLoader
+from django.urls import get_resolver
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def template_names(directory):
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.endswith(".html"):
+                path = os.path.relpath(os.path.join(root, name), directory)
+                yield path.replace(os.sep, "/")
+
+
+def compile_templates():
+    """Загружает шаблоны из DIRS; возвращает (число, кешируются ли)."""
+    count, cached = 0, False
+    for backend in engines.all():
+        engine = getattr(backend, "engine", None)
+        if engine is None:
+            continue
+        cached = cached or any(
+            isinstance(loader, CachedLoader)
+            for loader in engine.template_loaders
+        )
+        for directory in engine.dirs:
+            for name in template_names(directory):
+                backend.get_template(name)
+                count += 1
+    return count, cached
+
+
+def import_lazy_modules():
+    # URLconf тянет за собой views, формы и админку.
+    get_resolver().reverse_dict
+    if apps.is_installed("sorl.thumbnail"):
+        from sorl.thumbnail import default
+
+        # Это LazyObject: бэкенд, движок картинок и хранилище ключей
+        # создаются при первом обращении.
+        for lazy in (default.backend, default.engine, default.kvstore):
+            lazy._setup()
+
+
+def _environ(url):
+    parts = urlsplit(url)
+    return {
+        "REQUEST_METHOD": "GET",
+        "SCRIPT_NAME": "",
+        "PATH_INFO": parts.path,
+        "QUERY_STRING": parts.query,
+        "HTTP_HOST": settings.WARMUP_HOST,
+        # Адрес вне INTERNAL_IPS, чтобы страницы шли без debug toolbar.
+        "REMOTE_ADDR": "192.0.2.1",
+        "wsgi.url_scheme": "http",
+        "wsgi.input": BytesIO(),
+        "wsgi.errors": sys.stderr,
+    }
+
+
+def prime_pages(handler=None):
+    """Запрашивает страницы из WARMUP_URLS; возвращает их коды ответа.
+
+    Запросы идут прямо в get_response обработчика, минуя сигналы
+    request_started и request_finished: они закрывали бы соединения
+    с БД посреди прогрева.
+    """
+    handler = handler or WSGIHandler()
+    urls = import_string(settings.WARMUP_URLS)()
+    return {
+        url: handler.get_response(WSGIRequest(_environ(url))).status_code
+        for url in urls
+    }
+
+
+def warm_up(handler=None, prime=True):
+    """Прогревает воркер и возвращает отчёт с затраченным временем.
+
+    prime=False пропускает запросы страниц.
+    """
+    start = time.perf_counter()
+    templates, cached = compile_templates()
+    import_lazy_modules()
+    pages = prime_pages(handler) if prime else {}
+    return {
+        "templates": templates,
+        "cached_loader": cached,
+        "pages": pages,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def warm_up_on_start(handler):
+    """Прогрев из yatube/wsgi.py с отчётом в журнал."""
+    report = warm_up(handler)
+    logger.info(
+        "Прогрев: шаблонов %s, страниц %s, за %.2f с",
+        report["templates"],
+        len(report["pages"]),
+        report["seconds"],
+    )
+    return report
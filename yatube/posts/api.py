@@ -0,0 +1,206 @@
+"""JSON-лента для мобильных клиентов и агрегаторов.
+
+Строки берутся через .values() и сразу превращаются в JSON, без
+экземпляров моделей и шаблонов. Поддерживаются выбор полей (?fields=),
+курсорная пагинация (?cursor=) и компактный режим (?compact=1),
+в котором записи идут массивами значений, а не объектами.
+
+Здесь же POST-адреса подписки и отписки для кнопки на странице автора.
+"""
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_POST
+
+from core.cache import versioned_cache_page
+from core.paginator import CursorPaginator
+from . import follows
+from .cache import (
+    group_scopes,
+    index_scopes,
+    post_detail_scopes,
+    profile_scopes,
+)
+from .models import Follow, Group, Post, TimelineEntry, User, UserStats
+
+# Публичное имя поля и путь к нему от Post.
+FIELDS = {
+    "id": "id",
+    "text": "text",
+    "pub_date": "pub_date",
+    "author": "author__username",
+    "group": "group__slug",
+    "image": "image",
+    "comments": "comment_count",
+}
+DEFAULT_FIELDS = ("id", "text", "pub_date", "author", "group")
+POST_KEYS = ("pub_date", "id")
+# Лента подписок читается из TimelineEntry: ключ курсора и дата лежат
+# в самой записи, остальное - в посте.
+TIMELINE_KEYS = ("pub_date", "post_id")
+TIMELINE_LOOKUPS = {"id": "post_id", "pub_date": "pub_date"}
+COMPACT_SEPARATORS = (",", ":")
+
+
+def timeline_lookup(name):
+    return TIMELINE_LOOKUPS.get(name, "post__" + FIELDS[name])
+
+
+def selected_fields(request):
+    """Поля из ?fields=; неизвестные поля вызывают ValueError."""
+    raw = request.GET.get("fields")
+    if not raw:
+        return DEFAULT_FIELDS
+    names = tuple(dict.fromkeys(name.strip() for name in raw.split(",")))
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError("Неизвестные поля: " + ", ".join(unknown))
+    return names
+
+
+def serialize_value(name, value):
+    if value is None:
+        return None
+    if name == "pub_date":
+        return value.isoformat()
+    if name == "image":
+        return settings.MEDIA_URL + value if value else None
+    return value
+
+
+def serialize_rows(rows, names, lookups, compact):
+    if compact:
+        return [
+            [
+                serialize_value(name, row[lookups[name]])
+                for name in names
+            ]
+            for row in rows
+        ]
+    return [
+        {name: serialize_value(name, row[lookups[name]]) for name in names}
+        for row in rows
+    ]
+
+
+def error_response(message, status=400):
+    return JsonResponse(
+        {"error": message},
+        status=status,
+        json_dumps_params={"ensure_ascii": False},
+    )
+
+
+def api_response(data, compact):
+    params = {"ensure_ascii": False}
+    if compact:
+        params["separators"] = COMPACT_SEPARATORS
+    return JsonResponse(data, json_dumps_params=params)
+
+
+def feed_response(request, queryset, lookup=FIELDS.get, keys=POST_KEYS):
+    try:
+        names = selected_fields(request)
+    except ValueError as error:
+        return error_response(str(error))
+    compact = request.GET.get("compact") == "1"
+    lookups = {name: lookup(name) for name in names}
+    rows = queryset.values(*set(lookups.values()) | set(keys))
+    paginator = CursorPaginator(rows, settings.POSTS_PER_PAGE, keys=keys)
+    page_obj = paginator.get_cursor_page(request.GET.get("cursor"))
+    data = {
+        "results": serialize_rows(page_obj, names, lookups, compact),
+        "next": paginator.next_cursor,
+        "previous": paginator.previous_cursor,
+    }
+    if compact:
+        data["fields"] = names
+    return api_response(data, compact)
+
+
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, index_scopes, key_prefix="api_index"
+)
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, group_scopes, key_prefix="api_group"
+)
+def group_posts(request, slug):
+    group = get_object_or_404(Group.objects.only("pk"), slug=slug)
+    return feed_response(request, Post.objects.filter(group=group))
+
+
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, profile_scopes, key_prefix="api_profile"
+)
+def profile(request, username):
+    author = get_object_or_404(User.objects.only("pk"), username=username)
+    return feed_response(request, Post.objects.filter(author=author))
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error_response("Требуется авторизация", status=401)
+    return feed_response(
+        request,
+        TimelineEntry.objects.filter(user=request.user),
+        lookup=timeline_lookup,
+        keys=TIMELINE_KEYS,
+    )
+
+
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, post_detail_scopes, key_prefix="api_post"
+)
+def post_detail(request, post_id):
+    try:
+        names = selected_fields(request)
+    except ValueError as error:
+        return error_response(str(error))
+    compact = request.GET.get("compact") == "1"
+    lookups = {name: FIELDS[name] for name in names}
+    row = (
+        Post.objects.filter(pk=post_id)
+        .values(*set(lookups.values()))
+        .first()
+    )
+    if row is None:
+        return error_response("Запись не найдена", status=404)
+    data = serialize_rows([row], names, lookups, compact)[0]
+    if compact:
+        data = {"fields": names, "result": data}
+    return api_response(data, compact)
+
+
+def follow_status(author_id, following):
+    follower_count = (
+        UserStats.objects.filter(user_id=author_id)
+        .values_list("follower_count", flat=True)
+        .first()
+    )
+    return JsonResponse(
+        {"following": following, "follower_count": follower_count or 0}
+    )
+
+
+@require_POST
+def profile_follow(request, username):
+    if not request.user.is_authenticated:
+        return error_response("Требуется авторизация", status=401)
+    author = get_object_or_404(User.objects.only("pk"), username=username)
+    if author == request.user:
+        return error_response("Нельзя подписаться на себя")
+    Follow.objects.get_or_create(user=request.user, author=author)
+    return follow_status(author.pk, following=True)
+
+
+@require_POST
+def profile_unfollow(request, username):
+    if not request.user.is_authenticated:
+        return error_response("Требуется авторизация", status=401)
+    author = get_object_or_404(User.objects.only("pk"), username=username)
+    follows.unfollow(request.user, author)
+    return follow_status(author.pk, following=False)
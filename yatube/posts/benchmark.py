@@ -0,0 +1,214 @@
+"""Замер задержки и числа запросов для каждого адреса posts/urls.py.
+
+Адреса обходятся тестовым клиентом от имени самого активного читателя.
+Каждый адрес меряется холодным (кеш очищается перед запросом) и тёплым.
+Отдельно меряется пропускная способность записи комментариев
+к одному посту: по одному и через буфер.
+"""
+import math
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import OperationalError, connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.http import urlencode
+
+from .comment_buffer import CommentBuffer
+from .models import Comment, Group, Post, User
+from .urls import app_name, urlpatterns
+
+# Эти адреса меняют данные (api_follow и api_unfollow - только POST).
+MUTATING = {
+    "delete",
+    "profile_follow",
+    "profile_unfollow",
+    "api_follow",
+    "api_unfollow",
+}
+# Параметры строки запроса, без которых адрес ничего не делает.
+QUERY_ARGUMENTS = {"search": {"q": "word"}}
+PERCENTILES = (50, 95, 99)
+MODES = ("cold", "warm")
+# Метка комментариев замера, по ней они удаляются после прогона.
+COMMENT_MARK = "Замер записи комментариев"
+
+
+def percentile(values, rank):
+    """Перцентиль по ближайшему рангу."""
+    ordered = sorted(values)
+    index = max(math.ceil(rank / 100 * len(ordered)) - 1, 0)
+    return ordered[index]
+
+
+def sample_arguments():
+    """Значения параметров адресов: самые нагруженные объекты.
+
+    Возвращает None, если в базе нет данных для обхода.
+    """
+    post = Post.objects.order_by("-comment_count", "-pk").first()
+    group = (
+        Group.objects.annotate(total=Count("posts")).order_by("-total").first()
+    )
+    author = User.objects.order_by("-stats__follower_count", "pk").first()
+    if post is None or group is None or author is None:
+        return None
+    return {
+        "post_id": post.pk,
+        "slug": group.slug,
+        "username": author.username,
+        "table": "posts",
+        "word": (post.text.split() or [""])[0],
+    }
+
+
+def targets(arguments):
+    """Пары (имя адреса, URL) для всех безопасных адресов приложения."""
+    for pattern in urlpatterns:
+        if pattern.name in MUTATING:
+            continue
+        kwargs = {
+            name: arguments[name] for name in pattern.pattern.converters
+        }
+        url = reverse(f"{app_name}:{pattern.name}", kwargs=kwargs)
+        query = QUERY_ARGUMENTS.get(pattern.name)
+        if query:
+            url += "?" + urlencode(
+                {param: arguments[key] for param, key in query.items()}
+            )
+        yield pattern.name, url
+
+
+def reader():
+    return User.objects.order_by("-stats__following_count", "pk").first()
+
+
+def measure(client, url, repeat, cold):
+    timings, queries = [], []
+    status = None
+    for _ in range(repeat):
+        if cold:
+            cache.clear()
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = client.get(url)
+            if response.streaming:
+                b"".join(response.streaming_content)
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(captured))
+        status = response.status_code
+    result = {f"p{rank}": percentile(timings, rank) for rank in PERCENTILES}
+    result["queries"] = max(queries)
+    result["status"] = status
+    return result
+
+
+def run(repeat=20, arguments=None, user=None):
+    """Меряет все адреса и возвращает словарь для JSON."""
+    arguments = arguments or sample_arguments()
+    # Адрес вне INTERNAL_IPS, чтобы не мерить debug toolbar.
+    client = Client(REMOTE_ADDR="192.0.2.1")
+    user = user or reader()
+    if user is not None:
+        client.force_login(user)
+    results = {}
+    for name, url in targets(arguments):
+        # Первый запрос прогревает шаблоны и соединение.
+        client.get(url)
+        results[name] = {"url": url}
+        for mode in MODES:
+            results[name][mode] = measure(
+                client, url, repeat, cold=mode == "cold"
+            )
+    return results
+
+
+def compare(results, baseline, tolerance=1.2):
+    """Описания регрессий относительно baseline.
+
+    Регрессия - рост p95 больше чем в tolerance раз или рост числа
+    запросов.
+    """
+    regressions = []
+    for name, modes in results.items():
+        for mode in MODES:
+            old = baseline.get(name, {}).get(mode)
+            if old is None:
+                continue
+            new = modes[mode]
+            if new["p95"] > old["p95"] * tolerance:
+                regressions.append(
+                    f"{name} ({mode}): p95 {old['p95']:.1f} -> "
+                    f"{new['p95']:.1f} мс"
+                )
+            if new["queries"] > old["queries"]:
+                regressions.append(
+                    f"{name} ({mode}): запросов {old['queries']} -> "
+                    f"{new['queries']}"
+                )
+    return regressions
+
+
+def comment_throughput(post, authors, per_author, buffer=None):
+    """Пишет per_author комментариев от каждого автора в своём потоке.
+
+    Без buffer каждый комментарий - отдельный INSERT, с ним - очередь
+    CommentBuffer. Записанные комментарии удаляются после замера.
+    """
+    errors = []
+
+    def write(author):
+        try:
+            for i in range(per_author):
+                comment = Comment(
+                    post=post, author=author, text=f"{COMMENT_MARK} {i}"
+                )
+                try:
+                    if buffer is None or not buffer.submit(comment):
+                        comment.save()
+                except OperationalError as error:
+                    # database is locked: запись не дождалась блокировки.
+                    errors.append(error)
+        finally:
+            connection.close()
+
+    threads = [
+        threading.Thread(target=write, args=(author,)) for author in authors
+    ]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if buffer is not None:
+        buffer.stop()
+    seconds = time.perf_counter() - start
+    written = Comment.objects.filter(
+        post=post, text__startswith=COMMENT_MARK
+    )
+    count = written.count()
+    written.delete()
+    return {
+        "written": count,
+        "errors": len(errors),
+        "seconds": seconds,
+        "per_second": count / seconds if seconds else 0.0,
+    }
+
+
+def compare_comment_modes(post, authors, per_author, batch_size, flush_ms):
+    """Замер записи комментариев по одному и через буфер."""
+    return {
+        "direct": comment_throughput(post, authors, per_author),
+        "buffered": comment_throughput(
+            post,
+            authors,
+            per_author,
+            CommentBuffer(
+                len(authors) * per_author, batch_size, flush_ms / 1000
+            ),
+        ),
+    }
@@ -0,0 +1,126 @@
+"""Области кеша страниц приложения posts и правила их инвалидации."""
+from django.db.models import Count
+from django.urls import reverse
+
+from core.cache import bump_generations
+
+from .models import Comment, Group, Post
+
+SITE = "site"
+# Сколько самых наполненных групп прогревать после запуска
+WARMUP_GROUPS = 5
+
+
+def group_scope(slug):
+    return f"group:{slug}"
+
+
+def author_scope(username):
+    return f"author:{username}"
+
+
+def post_scope(post_id):
+    return f"post:{post_id}"
+
+
+def index_scopes(request):
+    return [SITE]
+
+
+def group_scopes(request, slug):
+    return [group_scope(slug)]
+
+
+def profile_scopes(request, username):
+    return [author_scope(username)]
+
+
+def post_detail_scopes(request, post_id):
+    """Пост зависит от себя, своего автора и своей группы.
+
+    Автор и группа узнаются коротким запросом по первичному ключу,
+    который дешевле любой отрисовки страницы.
+    """
+    row = (
+        Post.objects.filter(pk=post_id)
+        .values_list("author__username", "group__slug")
+        .first()
+    )
+    if row is None:
+        return [post_scope(post_id)]
+    username, slug = row
+    scopes = [post_scope(post_id), author_scope(username)]
+    if slug:
+        scopes.append(group_scope(slug))
+    return scopes
+
+
+def post_changed(post, previous_slug=None):
+    scopes = [SITE, post_scope(post.pk), author_scope(post.author.username)]
+    if post.group_id:
+        scopes.append(group_scope(post.group.slug))
+    if previous_slug:
+        scopes.append(group_scope(previous_slug))
+    bump_generations(scopes)
+
+
+def comment_changed(comment):
+    bump_generations([post_scope(comment.post_id)])
+
+
+def group_changed(group, previous_slug=None):
+    # Название группы выводится в лентах авторов, писавших в неё.
+    usernames = (
+        Post.objects.filter(group=group)
+        .values_list("author__username", flat=True)
+        .distinct()
+    )
+    scopes = [SITE, group_scope(group.slug)]
+    scopes += [author_scope(username) for username in usernames]
+    if previous_slug:
+        scopes.append(group_scope(previous_slug))
+    bump_generations(scopes)
+
+
+def user_changed(user, previous_username=None):
+    # Имя пользователя выводится в его постах во всех лентах
+    # и в его комментариях под чужими постами.
+    slugs = (
+        Post.objects.filter(author=user, group__isnull=False)
+        .values_list("group__slug", flat=True)
+        .distinct()
+    )
+    commented = (
+        Comment.objects.filter(author=user)
+        .values_list("post_id", flat=True)
+        .distinct()
+    )
+    scopes = [SITE, author_scope(user.username)]
+    scopes += [group_scope(slug) for slug in slugs]
+    scopes += [post_scope(post_id) for post_id in commented]
+    if previous_username:
+        scopes.append(author_scope(previous_username))
+    bump_generations(scopes)
+
+
+def follow_changed(follow):
+    # Кнопка подписки и число подписчиков на странице автора, число
+    # подписок на странице подписчика.
+    bump_generations(
+        [
+            author_scope(follow.author.username),
+            author_scope(follow.user.username),
+        ]
+    )
+
+
+def warm_up_urls():
+    """Первые страницы главной и самых наполненных групп."""
+    slugs = (
+        Group.objects.annotate(total=Count("posts"))
+        .order_by("-total")
+        .values_list("slug", flat=True)[:WARMUP_GROUPS]
+    )
+    return [reverse("posts:index")] + [
+        reverse("posts:group_list", kwargs={"slug": slug}) for slug in slugs
+    ]
@@ -0,0 +1,171 @@
+"""Буферизованная запись комментариев.
+
+При COMMENT_BUFFER_CAPACITY > 0 add_comment не вставляет строку сам,
+а кладёт проверенный комментарий в ограниченную очередь процесса.
+Фоновый поток пишет очередь через bulk_create пачками: как только
+набралось COMMENT_BUFFER_BATCH комментариев или прошло
+COMMENT_BUFFER_FLUSH_MS с первого из них. Так всплеск комментариев
+к одному посту занимает блокировку записи SQLite один раз на пачку.
+
+Гарантии сохранности: переполненная или остановленная очередь
+не теряет комментарий, а возвращает его на синхронную запись;
+при штатном завершении процесса (atexit) очередь дописывается
+до конца. Теряется только принятое в буфер при аварийном
+завершении процесса, не дольше чем за COMMENT_BUFFER_FLUSH_MS.
+"""
+import atexit
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import DatabaseError, connections, transaction
+
+from core.cache import bump_generations
+from . import counters
+from .cache import post_scope
+from .models import Comment
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+class CommentBuffer:
+    def __init__(self, capacity, batch_size, interval):
+        self.queue = queue.Queue(maxsize=capacity)
+        self.batch_size = batch_size
+        self.interval = interval
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = False
+
+    def submit(self, comment):
+        """Ставит комментарий в очередь; False, если его надо записать."""
+        if self._stopping:
+            return False
+        self._ensure_started()
+        try:
+            self.queue.put_nowait(comment)
+        except queue.Full:
+            return False
+        return True
+
+    def _ensure_started(self):
+        # Поток стартует при первом комментарии, а не при импорте:
+        # иначе он не пережил бы fork воркеров сервера.
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="comment-buffer", daemon=True
+                )
+                self._thread.start()
+
+    def _collect(self):
+        """Пачка комментариев и признак остановки."""
+        item = self.queue.get()
+        deadline = time.monotonic() + self.interval
+        batch = []
+        while item is not _STOP:
+            batch.append(item)
+            timeout = deadline - time.monotonic()
+            if len(batch) >= self.batch_size or timeout <= 0:
+                return batch, False
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                return batch, False
+        return batch, True
+
+    def _run(self):
+        try:
+            stopped = False
+            while not stopped:
+                batch, stopped = self._collect()
+                if batch:
+                    self.flush(batch)
+        finally:
+            connections.close_all()
+
+    def flush(self, comments):
+        """Записывает пачку, сдвигает счётчики и поколения постов."""
+        per_post = Counter(comment.post_id for comment in comments)
+        try:
+            with transaction.atomic():
+                Comment.objects.bulk_create(comments)
+                for post_id, count in per_post.items():
+                    counters.adjust_comments(post_id, count)
+        except DatabaseError:
+            # Например, пост удалили, пока комментарий ждал в очереди.
+            # Остальные комментарии пачки пишутся по одному.
+            logger.exception(
+                "Пачка из %s комментариев не записана", len(comments)
+            )
+            self._save_one_by_one(comments)
+            return
+        bump_generations([post_scope(post_id) for post_id in per_post])
+
+    def _save_one_by_one(self, comments):
+        for comment in comments:
+            try:
+                comment.save()
+            except DatabaseError:
+                logger.exception(
+                    "Комментарий к посту %s не записан", comment.post_id
+                )
+
+    def stop(self):
+        """Останавливает поток и дописывает всё, что осталось в очереди."""
+        self._stopping = True
+        with self._lock:
+            thread = self._thread
+        if thread is not None:
+            self.queue.put(_STOP)
+            thread.join()
+        rest = []
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                rest.append(item)
+        if rest:
+            self.flush(rest)
+
+
+def get_buffer():
+    """Буфер процесса или None, если буферизация выключена."""
+    global _buffer
+    if not settings.COMMENT_BUFFER_CAPACITY:
+        return None
+    with _buffer_lock:
+        if _buffer is None:
+            _buffer = CommentBuffer(
+                settings.COMMENT_BUFFER_CAPACITY,
+                settings.COMMENT_BUFFER_BATCH,
+                settings.COMMENT_BUFFER_FLUSH_MS / 1000,
+            )
+            atexit.register(_buffer.stop)
+        return _buffer
+
+
+def save_comment(comment):
+    """Сохраняет комментарий через буфер, если он включён и не полон."""
+    buffer = get_buffer()
+    if buffer is None or not buffer.submit(comment):
+        comment.save()
+
+
+def shutdown():
+    """Дописывает и сбрасывает буфер процесса."""
+    global _buffer
+    with _buffer_lock:
+        buffer, _buffer = _buffer, None
+    if buffer is not None:
+        atexit.unregister(buffer.stop)
+        buffer.stop()
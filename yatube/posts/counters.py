@@ -0,0 +1,109 @@
+"""Денормализованные счётчики постов, комментариев и подписок."""
+from django.db import transaction
+from django.db.models import Count, F
+
+from .models import Follow, Post, User, UserStats
+
+
+def adjust_user(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя.
+
+    Отсутствующую строку не создаём: пользователь может удаляться
+    каскадом прямо сейчас. Её восстановит reconcile_counters.
+    """
+    UserStats.objects.filter(user_id=user_id).update(
+        **{field: F(field) + delta for field, delta in deltas.items()}
+    )
+
+
+def adjust_comments(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=F("comment_count") + delta
+    )
+
+
+def _grouped_counts(queryset, field, ids):
+    rows = (
+        queryset.filter(**{f"{field}__in": ids})
+        .values(field)
+        .annotate(total=Count("pk"))
+        .values_list(field, "total")
+    )
+    return dict(rows)
+
+
+def reconcile_users(user_ids):
+    """Пересчитывает счётчики пачки пользователей.
+
+    Возвращает число исправленных или созданных строк.
+    """
+    user_ids = list(user_ids)
+    posts = _grouped_counts(Post.objects, "author_id", user_ids)
+    followers = _grouped_counts(Follow.objects, "author_id", user_ids)
+    following = _grouped_counts(Follow.objects, "user_id", user_ids)
+    stored = UserStats.objects.in_bulk(user_ids)
+    changed, created = [], []
+    for user_id in user_ids:
+        actual = {
+            "post_count": posts.get(user_id, 0),
+            "follower_count": followers.get(user_id, 0),
+            "following_count": following.get(user_id, 0),
+        }
+        stats = stored.get(user_id)
+        if stats is None:
+            created.append(UserStats(user_id=user_id, **actual))
+            continue
+        drifted = {
+            key: value
+            for key, value in actual.items()
+            if getattr(stats, key) != value
+        }
+        if drifted:
+            for key, value in drifted.items():
+                setattr(stats, key, value)
+            changed.append(stats)
+    with transaction.atomic():
+        UserStats.objects.bulk_create(created, ignore_conflicts=True)
+        UserStats.objects.bulk_update(
+            changed, ["post_count", "follower_count", "following_count"]
+        )
+    return len(changed) + len(created)
+
+
+def reconcile_posts(post_ids):
+    """Пересчитывает comment_count пачки постов."""
+    posts = Post.objects.filter(pk__in=list(post_ids)).annotate(
+        actual=Count("comments")
+    )
+    changed = []
+    for post in posts.only("pk", "comment_count"):
+        if post.comment_count != post.actual:
+            post.comment_count = post.actual
+            changed.append(post)
+    Post.objects.bulk_update(changed, ["comment_count"])
+    return len(changed)
+
+
+def batches(queryset, size):
+    """Первичные ключи таблицы пачками по size, по возрастанию."""
+    last = None
+    while True:
+        page = queryset.order_by("pk")
+        if last is not None:
+            page = page.filter(pk__gt=last)
+        ids = list(page.values_list("pk", flat=True)[:size])
+        if not ids:
+            return
+        yield ids
+        last = ids[-1]
+
+
+def reconcile_all(batch_size=1000):
+    """Исправляет все счётчики. Возвращает (пользователей, постов)."""
+    users = sum(
+        reconcile_users(ids) for ids in batches(User.objects, batch_size)
+    )
+    posts = sum(
+        reconcile_posts(ids) for ids in batches(Post.objects, batch_size)
+    )
+    return users, posts
@@ -0,0 +1,89 @@
+"""Потоковая выгрузка постов, комментариев и подписок.
+
+Строки читаются через QuerySet.iterator() кусками и сразу отдаются
+наружу, поэтому память не растёт с размером таблиц.
+"""
+import csv
+import json
+import zlib
+
+from .models import Comment, Follow, Post
+
+CHUNK_SIZE = 2000
+# Строки склеиваются в куски примерно такого размера перед отправкой.
+BUFFER_SIZE = 64 * 1024
+FORMATS = ("ndjson", "csv")
+TABLES = {
+    "posts": (
+        Post,
+        ("id", "author_id", "group_id", "text", "pub_date", "image"),
+    ),
+    "comments": (
+        Comment,
+        ("id", "post_id", "author_id", "text", "pub_date"),
+    ),
+    "follows": (Follow, ("id", "user_id", "author_id")),
+}
+
+
+def _plain(value):
+    # Даты в ISO 8601, остальное JSON и CSV умеют сами.
+    return value.isoformat() if hasattr(value, "isoformat") else value
+
+
+def rows(table, chunk_size=CHUNK_SIZE):
+    """Кортежи значений таблицы по возрастанию id."""
+    model, fields = TABLES[table]
+    queryset = model.objects.order_by("pk").values_list(*fields)
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield [_plain(value) for value in row]
+
+
+class _Echo:
+    # csv.writer пишет в файл; этот "файл" просто возвращает строку.
+    def write(self, value):
+        return value
+
+
+def ndjson_lines(table, chunk_size=CHUNK_SIZE):
+    _, fields = TABLES[table]
+    for row in rows(table, chunk_size):
+        yield json.dumps(dict(zip(fields, row)), ensure_ascii=False) + "\n"
+
+
+def csv_lines(table, chunk_size=CHUNK_SIZE):
+    _, fields = TABLES[table]
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows(table, chunk_size):
+        yield writer.writerow(row)
+
+
+def export_lines(table, export_format, chunk_size=CHUNK_SIZE):
+    """Строки выгрузки таблицы в формате ndjson или csv."""
+    if export_format == "csv":
+        return csv_lines(table, chunk_size)
+    return ndjson_lines(table, chunk_size)
+
+
+def buffered(lines, size=BUFFER_SIZE):
+    """Склеивает мелкие строки в куски, чтобы не писать по строке."""
+    buffer, length = [], 0
+    for line in lines:
+        buffer.append(line)
+        length += len(line)
+        if length >= size:
+            yield "".join(buffer)
+            buffer, length = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def gzip_chunks(lines):
+    """Сжимает поток строк в gzip на лету, не копя его целиком."""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for line in lines:
+        chunk = compressor.compress(line.encode())
+        if chunk:
+            yield chunk
+    yield compressor.flush()
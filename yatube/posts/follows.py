@@ -0,0 +1,41 @@
+"""Отписка одним запросом DELETE."""
+from django.db import connections, router
+from django.db.models.signals import post_delete
+
+from .models import Follow
+
+
+def delete_follow(user_id, author_id, using):
+    """Удаляет подписку одним DELETE; возвращает число удалённых строк.
+
+    Сигналы не отправляются, каскадов нет: на Follow никто не ссылается.
+    """
+    connection = connections[using]
+    quote = connection.ops.quote_name
+    meta = Follow._meta
+    sql = (
+        f"DELETE FROM {quote(meta.db_table)} "
+        f"WHERE {quote(meta.get_field('user').column)} = %s "
+        f"AND {quote(meta.get_field('author').column)} = %s"
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, author_id])
+        return cursor.rowcount
+
+
+def unfollow(user, author):
+    """Удаляет подписку; возвращает True, если она была.
+
+    QuerySet.delete() сначала выбирает строки для сигналов, здесь
+    же выполняется только DELETE. post_delete (лента, счётчики, кеш)
+    отправляется вручную, когда строка действительно удалена. Строка
+    не читалась, поэтому у instance в сигнале есть user и author,
+    а pk равен None (см. обработчики в signals.py).
+    """
+    using = router.db_for_write(Follow)
+    if not delete_follow(user.pk, author.pk, using):
+        return False
+    post_delete.send(
+        sender=Follow, instance=Follow(user=user, author=author), using=using
+    )
+    return True
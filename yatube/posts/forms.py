@@ -1,5 +1,6 @@
 from django.forms import ModelForm, Textarea
 
+from . import images
 from .models import Post, Comment
 
 
@@ -13,6 +14,13 @@ class PostForm(ModelForm):
             "text": Textarea(attrs={"cols": 40, "rows": 10}),
         }
 
+    def save(self, commit=True):
+        post = super().save(commit=commit)
+        # Файл картинки попадает в хранилище только при сохранении поста.
+        if commit and "image" in self.changed_data:
+            images.schedule(post)
+        return post
+
 
 class CommentForm(ModelForm):
     class Meta:
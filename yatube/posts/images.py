@@ -0,0 +1,134 @@
+"""Нормализация загруженных картинок постов.
+
+После сохранения поста картинка в пуле потоков миниатюр уменьшается
+до IMAGE_MAX_SIZE по большей стороне, поворачивается по EXIF, теряет
+метаданные и перекодируется в IMAGE_FORMAT. Пост переключается
+на новый файл, оригинал удаляется, и уже для него строится миниатюра:
+каждое следующее чтение картинки декодирует небольшой файл.
+"""
+import logging
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import cache, thumbnails
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+EXTENSIONS = {"WEBP": ".webp", "JPEG": ".jpg", "PNG": ".png"}
+
+
+def _needs_work(image, image_format):
+    return (
+        image.format != image_format
+        or max(image.size) > settings.IMAGE_MAX_SIZE
+        or bool(image.getexif())
+        or "icc_profile" in image.info
+    )
+
+
+def normalize(file, image_format=None):
+    """Перекодированная картинка из file в байтах.
+
+    Возвращает None, если файл уже нормализован или это анимация,
+    которую пересохранение превратило бы в один кадр.
+    """
+    image_format = image_format or settings.IMAGE_FORMAT
+    with Image.open(file) as image:
+        if getattr(image, "is_animated", False):
+            return None
+        if not _needs_work(image, image_format):
+            return None
+        image = ImageOps.exif_transpose(image)
+        limit = settings.IMAGE_MAX_SIZE
+        image.thumbnail((limit, limit), Image.LANCZOS)
+        has_alpha = image.mode in ("RGBA", "LA") or (
+            image.mode == "P" and "transparency" in image.info
+        )
+        if has_alpha and image_format != "JPEG":
+            image = image.convert("RGBA")
+        else:
+            image = image.convert("RGB")
+        buffer = BytesIO()
+        # exif и icc_profile не передаются, поэтому в файл не попадают.
+        image.save(
+            buffer,
+            image_format,
+            quality=settings.IMAGE_QUALITY,
+            optimize=True,
+        )
+    return buffer.getvalue()
+
+
+def normalize_post_image(post_id, name):
+    """Нормализует картинку поста; возвращает имя итогового файла.
+
+    None означает, что пост удалён или его картинку уже заменили.
+    """
+    try:
+        with default_storage.open(name) as file:
+            content = normalize(file)
+    except (OSError, Image.DecompressionBombError):
+        logger.exception("Не удалось нормализовать картинку %s", name)
+        return name
+    if content is None:
+        return name
+    root, _ = os.path.splitext(name)
+    new_name = default_storage.save(
+        root + EXTENSIONS[settings.IMAGE_FORMAT], ContentFile(content)
+    )
+    # Условие на старое имя не даёт затереть картинку, которую успели
+    # поменять, пока эта ждала в очереди. update() не трогает auto_now,
+    # а updated_at входит в ключ кеша фрагмента поста.
+    updated = Post.objects.filter(pk=post_id, image=name).update(
+        image=new_name, updated_at=timezone.now()
+    )
+    if not updated:
+        default_storage.delete(new_name)
+        return None
+    if not Post.objects.filter(image=name).exists():
+        default_storage.delete(name)
+    post = (
+        Post.objects.select_related("author", "group")
+        .filter(pk=post_id)
+        .first()
+    )
+    if post is not None:
+        cache.post_changed(post)
+    return new_name
+
+
+def process(post_id, name):
+    name = normalize_post_image(post_id, name)
+    if name:
+        thumbnails.pregenerate(name)
+
+
+def process_in_worker(post_id, name):
+    """process для потока пула: закрывает своё соединение с БД."""
+    try:
+        process(post_id, name)
+    finally:
+        connection.close()
+
+
+def schedule(post):
+    """Ставит обработку картинки в пул после фиксации транзакции."""
+    post_id, name = post.pk, post.image.name
+    if not name:
+        return
+    if not settings.THUMBNAIL_WORKERS:
+        transaction.on_commit(lambda: process(post_id, name))
+        return
+    transaction.on_commit(
+        lambda: thumbnails.get_executor().submit(
+            process_in_worker, post_id, name
+        )
+    )
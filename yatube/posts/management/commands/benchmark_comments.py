@@ -0,0 +1,56 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+from posts.models import Post, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Сравнивает пропускную способность записи комментариев к самому "
+        "обсуждаемому посту: по одному INSERT и через буфер"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--threads", type=int, default=8, help="пишущих потоков"
+        )
+        parser.add_argument(
+            "--per-thread",
+            type=int,
+            default=50,
+            help="комментариев от каждого потока",
+        )
+        parser.add_argument(
+            "--batch",
+            type=int,
+            default=settings.COMMENT_BUFFER_BATCH,
+            help="размер пачки буфера",
+        )
+        parser.add_argument(
+            "--flush-ms",
+            type=int,
+            default=settings.COMMENT_BUFFER_FLUSH_MS,
+            help="наибольшая задержка записи буфера",
+        )
+
+    def handle(self, *args, **options):
+        post = Post.objects.order_by("-comment_count", "-pk").first()
+        authors = list(User.objects.order_by("pk")[: options["threads"]])
+        if post is None or not authors:
+            raise CommandError(
+                "Нет данных для замера, сначала выполните generate_data"
+            )
+        results = benchmark.compare_comment_modes(
+            post,
+            authors,
+            options["per_thread"],
+            options["batch"],
+            options["flush_ms"],
+        )
+        for mode, row in results.items():
+            self.stdout.write(
+                f"{mode:<9} записано {row['written']}, ошибок "
+                f"{row['errors']}, {row['seconds']:.2f} с, "
+                f"{row['per_second']:.0f} в секунду"
+            )
@@ -0,0 +1,57 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Меряет p50/p95/p99 задержки и число запросов каждого адреса "
+        "posts/urls.py, пишет JSON и сравнивает с сохранённым замером"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="запросов на адрес"
+        )
+        parser.add_argument("--output", help="куда записать результат")
+        parser.add_argument("--baseline", help="JSON прошлого замера")
+        parser.add_argument(
+            "--tolerance",
+            type=float,
+            default=1.2,
+            help="во сколько раз p95 может вырасти без ошибки",
+        )
+
+    def handle(self, *args, **options):
+        arguments = benchmark.sample_arguments()
+        if arguments is None:
+            raise CommandError(
+                "Нет данных для замера, сначала выполните generate_data"
+            )
+        results = benchmark.run(options["repeat"], arguments)
+        for name, result in results.items():
+            self.stdout.write(name)
+            for mode in benchmark.MODES:
+                row = result[mode]
+                self.stdout.write(
+                    f"  {mode:<5} {row['status']}  "
+                    f"p50 {row['p50']:7.1f}  p95 {row['p95']:7.1f}  "
+                    f"p99 {row['p99']:7.1f} мс  запросов {row['queries']}"
+                )
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        if options["baseline"]:
+            with open(options["baseline"], encoding="utf-8") as file:
+                baseline = json.load(file)
+            regressions = benchmark.compare(
+                results, baseline, options["tolerance"]
+            )
+            if regressions:
+                raise CommandError(
+                    "Регрессии относительно baseline:\n"
+                    + "\n".join(regressions)
+                )
+            self.stdout.write(self.style.SUCCESS("Регрессий нет"))
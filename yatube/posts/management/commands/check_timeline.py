@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Сверяет материализованные ленты с таблицей подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--fix",
+            action="store_true",
+            help="пересобрать ленты, в которых найдены расхождения",
+        )
+
+    def handle(self, *args, **options):
+        broken = []
+        for user_id in timeline.timeline_users():
+            missing, stale = timeline.check(user_id)
+            if missing or stale:
+                broken.append(user_id)
+                self.stdout.write(
+                    f"user={user_id}: нет {len(missing)}, "
+                    f"лишних {len(stale)}"
+                )
+        if not broken:
+            self.stdout.write(self.style.SUCCESS("Ленты согласованы"))
+            return
+        if not options["fix"]:
+            raise CommandError(f"Расхождения в лентах: {len(broken)}")
+        for user_id in broken:
+            timeline.rebuild(user_id)
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересобрано лент: {len(broken)}")
+        )
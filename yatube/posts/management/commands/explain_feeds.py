@@ -0,0 +1,87 @@
+import re
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+
+from core.paginator import CursorPaginator
+from posts.models import Comment, Follow, Post, TimelineEntry
+
+# Полный проход по таблице без индекса и сортировка во временном B-дереве.
+FULL_SCAN = re.compile(r"^SCAN (TABLE )?\S+$")
+TEMP_SORT = "USE TEMP B-TREE"
+# Переход по курсору должен начинаться с поиска, а не с прохода индекса.
+INDEX_SCAN = "SCAN "
+
+
+def feed_queries(name, queryset, keys=("pub_date", "pk"), descending=True):
+    """Первая страница ленты и переходы по курсору вперёд и назад."""
+    paginator = CursorPaginator(
+        queryset, settings.POSTS_PER_PAGE, descending=descending, keys=keys
+    )
+    now = timezone.now()
+    yield name, paginator.page_queryset(), False
+    yield f"{name} (next)", paginator.page_queryset(("n", now, 1)), True
+    yield f"{name} (previous)", paginator.page_queryset(("p", now, 1)), True
+
+
+def hot_queries():
+    """Запросы, которые выполняют страницы posts/views.py."""
+    posts = Post.objects.select_related("author", "group")
+    yield from feed_queries("index", posts)
+    yield from feed_queries("group_posts", posts.filter(group_id=1))
+    yield from feed_queries("profile", posts.filter(author_id=1))
+    yield from feed_queries(
+        "follow_index",
+        TimelineEntry.objects.filter(user_id=1).select_related(
+            "post__author", "post__group"
+        ),
+        keys=("pub_date", "post_id"),
+    )
+    comments = Comment.objects.filter(post_id=1).select_related("author")
+    yield from feed_queries(
+        "post_detail comments", comments, descending=False
+    )
+    following = Follow.objects.filter(user_id=1, author_id=1).values("pk")
+    yield "profile following", following[:1], False
+    followers = Follow.objects.filter(author_id=1).values("user_id")
+    yield "timeline fan-out", followers, False
+
+
+def explain(queryset):
+    sql, params = queryset.query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute("EXPLAIN QUERY PLAN " + sql, params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+class Command(BaseCommand):
+    help = (
+        "Проверяет планы горячих запросов лент: падает на полном "
+        "сканировании таблицы или сортировке во временном B-дереве"
+    )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "sqlite":
+            raise CommandError("EXPLAIN QUERY PLAN доступен только в SQLite")
+        failed = []
+        for name, queryset, keyset in hot_queries():
+            plan = explain(queryset)
+            bad = [
+                step
+                for step in plan
+                if FULL_SCAN.match(step)
+                or TEMP_SORT in step
+                or keyset and step.startswith(INDEX_SCAN)
+            ]
+            if bad:
+                failed.append(name)
+            self.stdout.write(f"{'FAIL' if bad else 'ok'}  {name}")
+            for step in plan:
+                self.stdout.write(f"      {step}")
+        if failed:
+            raise CommandError(
+                "Запросы без подходящего индекса: " + ", ".join(failed)
+            )
+        self.stdout.write(self.style.SUCCESS("Все планы используют индексы"))
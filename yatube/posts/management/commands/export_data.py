@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import export
+
+
+class Command(BaseCommand):
+    help = "Потоково выгружает посты, комментарии или подписки"
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=sorted(export.TABLES))
+        parser.add_argument(
+            "--format",
+            dest="export_format",
+            choices=export.FORMATS,
+            default="ndjson",
+        )
+        parser.add_argument(
+            "--gzip", action="store_true", help="сжать вывод в gzip"
+        )
+        parser.add_argument(
+            "--output", "-o", help="файл для записи, по умолчанию stdout"
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=export.CHUNK_SIZE,
+            help="сколько строк читать из БД за раз",
+        )
+
+    def handle(self, *args, **options):
+        lines = export.export_lines(
+            options["table"], options["export_format"], options["chunk_size"]
+        )
+        output = options["output"]
+        if options["gzip"]:
+            if not output:
+                raise CommandError("Для --gzip укажите файл в --output")
+            with open(output, "wb") as file:
+                for chunk in export.gzip_chunks(lines):
+                    file.write(chunk)
+        elif output:
+            with open(output, "w", encoding="utf-8", newline="") as file:
+                file.writelines(export.buffered(lines))
+        else:
+            for chunk in export.buffered(lines):
+                self.stdout.write(chunk, ending="")
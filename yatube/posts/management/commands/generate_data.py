@@ -0,0 +1,69 @@
+from django.core.management.base import BaseCommand
+
+from posts.synthetic import Generator
+
+
+class Command(BaseCommand):
+    help = (
+        "Создаёт синтетических пользователей, группы, посты с картинками, "
+        "комментарии и подписки со степенным распределением популярности"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--posts", type=int, default=10000)
+        parser.add_argument("--comments", type=int, default=30000)
+        parser.add_argument("--groups", type=int, default=20)
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="среднее число подписок на пользователя",
+        )
+        parser.add_argument(
+            "--image-ratio",
+            type=float,
+            default=0.1,
+            help="доля постов с картинкой",
+        )
+        parser.add_argument(
+            "--alpha",
+            type=float,
+            default=1.2,
+            help="показатель степенного закона популярности",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--prefix",
+            default="synthetic_",
+            help="префикс имён пользователей, групп и картинок",
+        )
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        generator = Generator(
+            users=options["users"],
+            posts=options["posts"],
+            comments=options["comments"],
+            groups=options["groups"],
+            follows=options["follows"],
+            image_ratio=options["image_ratio"],
+            alpha=options["alpha"],
+            seed=options["seed"],
+            prefix=options["prefix"],
+            batch_size=options["batch_size"],
+        )
+
+        def report(table, loader):
+            self.stdout.write(
+                f"{table}: записей {loader.processed}, "
+                f"пропущено {loader.skipped}"
+            )
+
+        generator.run(report)
+        self.stdout.write(
+            self.style.SUCCESS(
+                "Готово. Миниатюры можно построить командой "
+                "generate_thumbnails"
+            )
+        )
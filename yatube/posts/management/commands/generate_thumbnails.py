@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from posts import thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = (
+        "Строит недостающие миниатюры всех ширин (thumbnails.RENDITIONS) "
+        "для картинок постов параллельно"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=4,
+            help="число потоков генерации",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="сколько картинок проверять одним запросом",
+        )
+        parser.add_argument(
+            "--report-every",
+            type=int,
+            default=100,
+            help="как часто печатать прогресс",
+        )
+
+    def handle(self, *args, **options):
+        names = list(
+            Post.objects.exclude(image="")
+            .values_list("image", flat=True)
+            .distinct()
+        )
+        size = max(options["batch_size"], 1)
+        # Готовые миниатюры отсеиваются пачками по хранилищу sorl,
+        # без открытия файлов.
+        names = [
+            name
+            for start in range(0, len(names), size)
+            for name in thumbnails.missing(names[start:start + size])
+        ]
+        total, done, failed = len(names), 0, 0
+        every = max(options["report_every"], 1)
+        with ThreadPoolExecutor(max_workers=options["workers"]) as pool:
+            futures = [
+                pool.submit(thumbnails.pregenerate_in_worker, name)
+                for name in names
+            ]
+            for future in as_completed(futures):
+                done += 1
+                failed += not future.result()
+                if done % every == 0 or done == total:
+                    self.stdout.write(f"{done}/{total}, ошибок: {failed}")
+        self.stdout.write(
+            self.style.SUCCESS(f"Миниатюр готово: {total - failed} из {total}")
+        )
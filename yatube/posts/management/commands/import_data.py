@@ -0,0 +1,49 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from posts import importer
+
+
+class Command(BaseCommand):
+    help = (
+        "Загружает пользователей, группы, посты, комментарии или подписки "
+        "из NDJSON или CSV пачками через bulk_create. Авторы и читатели "
+        "указываются по username, группы по slug, посты по id"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("table", choices=importer.TABLES)
+        parser.add_argument("path", help="файл с записями, '-' для stdin")
+        parser.add_argument(
+            "--format",
+            dest="import_format",
+            choices=("ndjson", "csv"),
+            help="по умолчанию определяется по расширению файла",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=importer.BATCH_SIZE,
+            help="сколько записей писать в одной транзакции",
+        )
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        import_format = options["import_format"] or (
+            "csv" if path.endswith(".csv") else "ndjson"
+        )
+        loader = importer.Importer(options["batch_size"])
+        if path == "-":
+            records = importer.read_records(sys.stdin, import_format)
+            loader.run(options["table"], records)
+        else:
+            with open(path, encoding="utf-8", newline="") as file:
+                records = importer.read_records(file, import_format)
+                loader.run(options["table"], records)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Обработано записей: {loader.processed}, "
+                f"пропущено: {loader.skipped}"
+            )
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts import timeline
+
+
+class Command(BaseCommand):
+    help = "Пересобирает материализованные ленты подписок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            dest="users",
+            help="id читателя; по умолчанию все ленты",
+        )
+
+    def handle(self, *args, **options):
+        users = options["users"] or timeline.timeline_users()
+        for user_id in users:
+            timeline.rebuild(user_id)
+        self.stdout.write(
+            self.style.SUCCESS(f"Пересобрано лент: {len(users)}")
+        )
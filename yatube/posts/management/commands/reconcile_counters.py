@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from posts import counters
+
+
+class Command(BaseCommand):
+    help = "Пересчитывает денормализованные счётчики пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="сколько строк пересчитывать за один проход",
+        )
+
+    def handle(self, *args, **options):
+        users, posts = counters.reconcile_all(options["batch_size"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Исправлено счётчиков: пользователей {users}, постов {posts}"
+            )
+        )
@@ -0,0 +1,73 @@
+# Generated by Django 2.2.16 on 2026-10-18 19:57
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _count(model, field):
+    return Subquery(
+        model.objects.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(total=Count('pk'))
+        .values('total')
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Post = apps.get_model('posts', 'Post')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Comment = apps.get_model('posts', 'Comment')
+    Post.objects.update(comment_count=Coalesce(_count(Comment, 'post'), 0))
+    users = User.objects.annotate(
+        posts_total=_count(Post, 'author'),
+        followers_total=_count(Follow, 'author'),
+        following_total=_count(Follow, 'user'),
+    )
+    UserStats.objects.bulk_create(
+        (
+            UserStats(
+                user_id=user.pk,
+                post_count=user.posts_total or 0,
+                follower_count=user.followers_total or 0,
+                following_count=user.following_total or 0,
+            )
+            for user in users.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0011_post_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('post_count', models.PositiveIntegerField(default=0, verbose_name='Постов')),
+                ('follower_count', models.PositiveIntegerField(default=0, verbose_name='Подписчиков')),
+                ('following_count', models.PositiveIntegerField(default=0, verbose_name='Подписок')),
+            ],
+            options={
+                'verbose_name': 'Счётчики пользователя',
+                'verbose_name_plural': 'Счётчики пользователей',
+            },
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Комментариев'),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+from django.db import migrations
+
+# Внешнее содержимое: индекс хранит только токены, текст остаётся
+# в posts_post. Триггеры держат индекс в актуальном состоянии при
+# любой записи, включая bulk_create и QuerySet.update().
+CREATE = [
+    """
+    CREATE VIRTUAL TABLE posts_post_fts USING fts5(
+        text,
+        content='posts_post',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_insert AFTER INSERT ON posts_post BEGIN
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_delete AFTER DELETE ON posts_post BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+    END
+    """,
+    """
+    CREATE TRIGGER posts_post_fts_update AFTER UPDATE OF text ON posts_post
+    BEGIN
+        INSERT INTO posts_post_fts(posts_post_fts, rowid, text)
+        VALUES ('delete', old.id, old.text);
+        INSERT INTO posts_post_fts(rowid, text) VALUES (new.id, new.text);
+    END
+    """,
+    "INSERT INTO posts_post_fts(posts_post_fts) VALUES ('rebuild')",
+]
+
+DROP = [
+    'DROP TRIGGER IF EXISTS posts_post_fts_update',
+    'DROP TRIGGER IF EXISTS posts_post_fts_delete',
+    'DROP TRIGGER IF EXISTS posts_post_fts_insert',
+    'DROP TABLE IF EXISTS posts_post_fts',
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 есть только в SQLite, на других СУБД поиск идёт по LIKE.
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(CREATE), _run(DROP)),
+    ]
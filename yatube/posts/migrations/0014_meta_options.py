@@ -0,0 +1,21 @@
+# Generated by Django 2.2.16 on 2026-10-18 20:53
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0013_post_search'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='follow',
+            options={'verbose_name': 'Подписка', 'verbose_name_plural': 'Подписки'},
+        ),
+        migrations.AlterModelOptions(
+            name='group',
+            options={'verbose_name': 'Группа', 'verbose_name_plural': 'Группы'},
+        ),
+    ]
@@ -48,11 +48,32 @@ class Post(CreatedModel):
     )
     # Аргумент upload_to указывает директорию,
     # в которую будут загружаться пользовательские файлы.
+    # Меняется при каждом сохранении; входит в ключ кеша фрагмента поста.
+    updated_at = models.DateTimeField("Дата изменения", auto_now=True)
+    comment_count = models.PositiveIntegerField(
+        "Комментариев", default=0, editable=False
+    )
 
     class Meta:
-        ordering = ["-pub_date"]
+        ordering = ["-pub_date", "-id"]
         verbose_name = "Пост"
         verbose_name_plural = "Посты"
+        # id замыкает ключ ленты: без него SQLite досортировывает
+        # посты с одинаковой датой во временном B-дереве.
+        indexes = [
+            models.Index(
+                fields=["-pub_date", "-id"],
+                name="post_date_idx",
+            ),
+            models.Index(
+                fields=["author", "-pub_date", "-id"],
+                name="post_author_date_idx",
+            ),
+            models.Index(
+                fields=["group", "-pub_date", "-id"],
+                name="post_group_date_idx",
+            ),
+        ]
 
     def __str__(self) -> str:
         return self.text[: settings.TEXT_SLICE]
@@ -77,8 +98,15 @@ class Comment(CreatedModel):
     )
 
     class Meta:
+        ordering = ["pub_date", "id"]
         verbose_name = "Комментарий"
         verbose_name_plural = "Комментарии"
+        indexes = [
+            models.Index(
+                fields=["post", "pub_date"],
+                name="comment_post_date_idx",
+            ),
+        ]
 
 
 class Follow(models.Model):
@@ -102,3 +130,75 @@ class Follow(models.Model):
                 name="unique_follow",
             )
         ]
+        indexes = [
+            models.Index(
+                fields=["author", "user"],
+                name="follow_author_user_idx",
+            ),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок: строка на пару читатель-пост."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="timeline",
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name="timeline_entries",
+    )
+    # Автор и дата продублированы из поста, чтобы лента читалась
+    # диапазоном по индексу, а отписка удаляла строки без JOIN.
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    pub_date = models.DateTimeField("Дата создания поста")
+
+    class Meta:
+        ordering = ["-pub_date", "-post_id"]
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"],
+                name="unique_timeline_entry",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-pub_date", "-post"],
+                name="timeline_user_date_idx",
+            ),
+            models.Index(
+                fields=["user", "author"],
+                name="timeline_user_author_idx",
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Денормализованные счётчики пользователя.
+
+    Поддерживаются сигналами через F()-выражения, расхождения
+    исправляет команда reconcile_counters.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="stats",
+    )
+    post_count = models.PositiveIntegerField("Постов", default=0)
+    follower_count = models.PositiveIntegerField("Подписчиков", default=0)
+    following_count = models.PositiveIntegerField("Подписок", default=0)
+
+    class Meta:
+        verbose_name = "Счётчики пользователя"
+        verbose_name_plural = "Счётчики пользователей"
@@ -0,0 +1,61 @@
+"""Полнотекстовый поиск по постам через индекс SQLite FTS5."""
+import math
+import re
+
+from django.db import connection
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from core.paginator import CursorPaginator
+from .models import Post
+
+FTS_TABLE = "posts_post_fts"
+WORD = re.compile(r"\w+")
+
+
+def match_expression(query):
+    """Запрос пользователя в выражение MATCH.
+
+    Слова берутся в кавычки, так что операторы FTS5 в запросе не ломают
+    разбор, и ищутся по префиксу, чтобы находились другие окончания.
+    """
+    return " ".join(f'"{word}"*' for word in WORD.findall(query))
+
+
+def search_posts(query):
+    """Посты по запросу с полем rank: чем меньше, тем релевантнее."""
+    posts = Post.objects.select_related("author", "group")
+    expression = match_expression(query)
+    if not expression or connection.vendor != "sqlite":
+        # Без FTS5 ищем по LIKE, все найденные одинаково релевантны.
+        if not expression:
+            posts = posts.none()
+        return posts.filter(text__icontains=query).annotate(
+            rank=Value(0.0, output_field=FloatField())
+        )
+    return posts.extra(
+        tables=[FTS_TABLE],
+        where=[f"{FTS_TABLE}.rowid = posts_post.id", f"{FTS_TABLE} MATCH %s"],
+        params=[expression],
+    ).annotate(rank=RawSQL(f"{FTS_TABLE}.rank", (), FloatField()))
+
+
+def matching_ids(query):
+    """Подзапрос с id найденных постов для фильтра pk__in."""
+    return search_posts(query).values("pk")
+
+
+class SearchPaginator(CursorPaginator):
+    """Курсор по (rank, id): результаты идут от самых релевантных."""
+
+    def __init__(self, object_list, per_page):
+        super().__init__(
+            object_list, per_page, descending=False, keys=("rank", "pk")
+        )
+
+    def dump_key(self, value):
+        return repr(value)
+
+    def load_key(self, raw):
+        value = float(raw)
+        return value if math.isfinite(value) else None
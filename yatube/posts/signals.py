@@ -0,0 +1,155 @@
+from django.db.models.signals import (
+    post_delete,
+    post_save,
+    pre_delete,
+    pre_save,
+)
+from django.dispatch import receiver
+
+from . import cache, counters, timeline
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+@receiver(post_save, sender=Post)
+def fan_out_new_post(sender, instance, created, **kwargs):
+    if created:
+        timeline.fan_out_post(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    if created:
+        timeline.backfill(instance.user_id, instance.author_id)
+
+
+# post_delete для Follow приходит и из follows.unfollow с несохранённым
+# экземпляром: там есть только user и author, pk равен None. Обработчики
+# подписок не должны опираться на instance.pk.
+
+
+@receiver(post_delete, sender=Follow)
+def prune_timeline(sender, instance, **kwargs):
+    timeline.prune(instance.user_id, instance.author_id)
+
+
+# Денормализованные счётчики. Сигналы срабатывают и в post_create,
+# delete_post, add_comment, profile_follow/unfollow, и в админке.
+
+
+@receiver(post_save, sender=User)
+def create_user_stats(sender, instance, created, **kwargs):
+    if created:
+        UserStats.objects.get_or_create(user=instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_user(instance.author_id, post_count=1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    counters.adjust_user(instance.author_id, post_count=-1)
+
+
+@receiver(post_save, sender=Comment)
+def count_new_comment(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_comments(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def count_deleted_comment(sender, instance, **kwargs):
+    counters.adjust_comments(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_user(instance.author_id, follower_count=1)
+        counters.adjust_user(instance.user_id, following_count=1)
+
+
+# Без instance.pk: см. follows.unfollow.
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    counters.adjust_user(instance.author_id, follower_count=-1)
+    counters.adjust_user(instance.user_id, following_count=-1)
+
+
+# Инвалидация версионированного кеша страниц. Перед сохранением
+# запоминаем прежние slug и username: страницы по старым адресам
+# тоже должны устареть.
+
+
+@receiver(pre_save, sender=Post)
+def remember_post_group(sender, instance, **kwargs):
+    instance._previous_slug = (
+        Post.objects.filter(pk=instance.pk)
+        .values_list("group__slug", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(pre_save, sender=Group)
+def remember_group_slug(sender, instance, **kwargs):
+    instance._previous_slug = (
+        Group.objects.filter(pk=instance.pk)
+        .values_list("slug", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, **kwargs):
+    instance._previous_username = (
+        User.objects.filter(pk=instance.pk)
+        .values_list("username", flat=True)
+        .first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    cache.post_changed(instance, getattr(instance, "_previous_slug", None))
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment(sender, instance, **kwargs):
+    cache.comment_changed(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group(sender, instance, **kwargs):
+    # При удалении группы её посты нужно найти до SET_NULL,
+    # поэтому используется pre_delete.
+    cache.group_changed(instance, getattr(instance, "_previous_slug", None))
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user(sender, instance, created=False, **kwargs):
+    update_fields = kwargs.get("update_fields")
+    # Вход на сайт обновляет только last_login, страницы это не меняет.
+    if created or update_fields and set(update_fields) == {"last_login"}:
+        return
+    cache.user_changed(
+        instance, getattr(instance, "_previous_username", None)
+    )
+
+
+# Без instance.pk: см. follows.unfollow.
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow(sender, instance, **kwargs):
+    cache.follow_changed(instance)
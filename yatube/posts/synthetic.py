@@ -0,0 +1,168 @@
+"""Синтетические данные для замеров производительности.
+
+Популярность авторов, постов и подписок распределена по степенному
+закону: немногие авторы пишут и собирают подписчиков больше всех,
+как на живом сайте. Записи загружаются через importer пачками.
+"""
+import itertools
+import random
+from datetime import timedelta
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db.models import Max
+from django.utils import timezone
+from faker import Faker
+from PIL import Image
+
+from .importer import Importer
+from .models import Comment, Post
+
+IMAGE_VARIANTS = 10
+IMAGE_SIZE = (1200, 800)
+
+
+def zipf_cum_weights(count, alpha):
+    """Накопленные веса 1 / rank^alpha для random.choices."""
+    return list(
+        itertools.accumulate(1 / rank ** alpha for rank in range(1, count + 1))
+    )
+
+
+class Generator:
+    def __init__(
+        self,
+        users,
+        posts,
+        comments,
+        groups,
+        follows,
+        image_ratio=0.1,
+        alpha=1.2,
+        seed=0,
+        prefix="synthetic_",
+        batch_size=1000,
+    ):
+        self.counts = {
+            "users": users,
+            "posts": posts,
+            "comments": comments,
+            "groups": groups,
+            "follows": follows,
+        }
+        self.image_ratio = image_ratio
+        self.alpha = alpha
+        self.prefix = prefix
+        self.batch_size = batch_size
+        self.random = random.Random(seed)
+        self.fake = Faker("ru_RU")
+        self.fake.seed_instance(seed)
+        self.usernames = [f"{prefix}{i}" for i in range(users)]
+        self.user_weights = zipf_cum_weights(users, alpha)
+        self.now = timezone.now()
+        self.post_ids = range(0)
+
+    def run(self, report=None):
+        """Загружает все таблицы; report(table, importer) после каждой."""
+        for table in ("groups", "users", "posts", "comments", "follows"):
+            loader = Importer(self.batch_size)
+            loader.run(table, getattr(self, table)())
+            if report:
+                report(table, loader)
+
+    def _popular_user(self):
+        [username] = self.random.choices(
+            self.usernames, cum_weights=self.user_weights
+        )
+        return username
+
+    def _pub_date(self):
+        seconds = self.random.uniform(0, 365 * 24 * 60 * 60)
+        return (self.now - timedelta(seconds=seconds)).isoformat()
+
+    def _group_slugs(self):
+        prefix = self.prefix.replace("_", "-")
+        return [f"{prefix}group-{i}" for i in range(self.counts["groups"])]
+
+    def groups(self):
+        for slug in self._group_slugs():
+            yield {
+                "title": self.fake.sentence(nb_words=3)[:200],
+                "slug": slug,
+                "description": self.fake.paragraph(),
+            }
+
+    def users(self):
+        for username in self.usernames:
+            yield {
+                "username": username,
+                "first_name": self.fake.first_name(),
+                "last_name": self.fake.last_name(),
+                "email": f"{username}@example.com",
+            }
+
+    def images(self):
+        """Несколько картинок, общих для всех постов с изображением."""
+        names = []
+        for i in range(IMAGE_VARIANTS):
+            color = tuple(self.random.randrange(256) for _ in range(3))
+            buffer = BytesIO()
+            Image.new("RGB", IMAGE_SIZE, color).save(buffer, "JPEG")
+            names.append(
+                default_storage.save(
+                    f"posts/{self.prefix}{i}.jpg",
+                    ContentFile(buffer.getvalue()),
+                )
+            )
+        return names
+
+    def posts(self):
+        if not self.counts["users"]:
+            return
+        slugs = self._group_slugs()
+        images = self.images() if self.image_ratio else []
+        first_id = (Post.objects.aggregate(last=Max("pk"))["last"] or 0) + 1
+        self.post_ids = range(first_id, first_id + self.counts["posts"])
+        for post_id in self.post_ids:
+            with_group = slugs and self.random.random() < 0.7
+            with_image = images and self.random.random() < self.image_ratio
+            yield {
+                "id": post_id,
+                "author": self._popular_user(),
+                "group": self.random.choice(slugs) if with_group else None,
+                "text": self.fake.text(
+                    max_nb_chars=self.random.randint(80, 1000)
+                ),
+                "pub_date": self._pub_date(),
+                "image": self.random.choice(images) if with_image else "",
+            }
+
+    def comments(self):
+        post_ids = self.post_ids
+        if not post_ids or not self.counts["users"]:
+            return
+        weights = zipf_cum_weights(len(post_ids), self.alpha)
+        first_id = (
+            Comment.objects.aggregate(last=Max("pk"))["last"] or 0
+        ) + 1
+        for comment_id in range(first_id, first_id + self.counts["comments"]):
+            [post_id] = self.random.choices(post_ids, cum_weights=weights)
+            yield {
+                "id": comment_id,
+                "post_id": post_id,
+                "author": self.random.choice(self.usernames),
+                "text": self.fake.sentence(),
+                "pub_date": self._pub_date(),
+            }
+
+    def follows(self):
+        # В среднем follows подписок на читателя, авторы выбираются
+        # по степенному закону; повторы отбросит ignore_conflicts.
+        average = self.counts["follows"]
+        for username in self.usernames:
+            degree = self.random.randint(0, 2 * average)
+            for author in self.random.choices(
+                self.usernames, cum_weights=self.user_weights, k=degree
+            ):
+                yield {"user": username, "author": author}
@@ -0,0 +1,62 @@
+import hashlib
+
+from django import template
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from posts import thumbnails
+
+register = template.Library()
+
+FRAGMENT_TEMPLATE = "posts/includes/post_item.html"
+LAZY = 'loading="lazy"'
+
+
+def fragment_key(post, group_stick):
+    """Ключ фрагмента: пост, время его правки и данные автора и группы."""
+    author, group = post.author, post.group
+    related = "|".join(
+        [
+            author.username,
+            author.get_full_name(),
+            group.slug if group else "",
+            group.title if group else "",
+        ]
+    )
+    digest = hashlib.md5(related.encode()).hexdigest()
+    stamp = post.updated_at.timestamp()
+    return f"post_item:{post.pk}:{stamp}:{digest}:{int(bool(group_stick))}"
+
+
+@register.simple_tag(takes_context=True)
+def post_items(context, posts):
+    """Отрисованные карточки постов страницы.
+
+    Готовые фрагменты берутся из кеша одним get_many, отрисовываются
+    и кладутся в кеш только промахи. Миниатюры для промахов
+    подгружаются пачкой заранее.
+    """
+    group_stick = context.get("group_stick", False)
+    posts = list(posts)
+    keys = [fragment_key(post, group_stick) for post in posts]
+    cached = cache.get_many(keys)
+    to_render = [
+        (post, key) for post, key in zip(posts, keys) if key not in cached
+    ]
+    thumbnails.prefetch(post for post, _ in to_render)
+    item_template = get_template(FRAGMENT_TEMPLATE)
+    missed = {
+        key: item_template.render({"post": post, "group_stick": group_stick})
+        for post, key in to_render
+    }
+    if missed:
+        cache.set_many(missed, settings.TIME_OF_CACHE)
+        cached.update(missed)
+    items = [cached[key] for key in keys]
+    # Фрагменты кешируются с ленивой загрузкой картинки; первая
+    # карточка страницы видна сразу, её картинка грузится без задержки.
+    if items:
+        items[0] = items[0].replace(LAZY, "", 1)
+    return [mark_safe(item) for item in items]
@@ -4,13 +4,23 @@ import tempfile
 from django.urls import reverse
 from datetime import date
 from django.test import TestCase, Client, override_settings
+from django.core.files.base import ContentFile
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.conf import settings
 from django.core.cache import cache
 
+from core.storage import HashedMediaStorage
 from ..models import Post, Group, User
 
 TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b"\x47\x49\x46\x38\x39\x61\x02\x00"
+    b"\x01\x00\x80\x00\x00\x00\x00\x00"
+    b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
+    b"\x00\x00\x00\x2C\x00\x00\x00\x00"
+    b"\x02\x00\x01\x00\x00\x02\x02\x0C"
+    b"\x0A\x00\x3B"
+)
 
 
 @override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
@@ -30,14 +40,7 @@ class PostBaseTestCase(TestCase):
             slug="test-slug-1",
             description="Тестовое описание 1",
         )
-        cls.small_gif = (
-            b"\x47\x49\x46\x38\x39\x61\x02\x00"
-            b"\x01\x00\x80\x00\x00\x00\x00\x00"
-            b"\xFF\xFF\xFF\x21\xF9\x04\x00\x00"
-            b"\x00\x00\x00\x2C\x00\x00\x00\x00"
-            b"\x02\x00\x01\x00\x00\x02\x02\x0C"
-            b"\x0A\x00\x3B"
-        )
+        cls.small_gif = SMALL_GIF
         cls.uploaded = SimpleUploadedFile(
             name="small.gif", content=cls.small_gif, content_type="image/gif"
         )
@@ -99,8 +102,14 @@ class PostBaseTestCase(TestCase):
             "redir_create": "/auth/login/?next=/create/",
             "redir_edit": f"/auth/login/?next=/posts/{cls.post.id}/edit/",
         }
-        cls.IMAGE_URL = "posts/small.gif"
-        cls.FORM_IMAGE_URL = "posts/form.gif"
+        # Загрузки сохраняются с хешем содержимого в имени.
+        storage = HashedMediaStorage()
+        cls.IMAGE_URL = storage.hashed_name(
+            "posts/small.gif", ContentFile(SMALL_GIF)
+        )
+        cls.FORM_IMAGE_URL = storage.hashed_name(
+            "posts/form.gif", ContentFile(SMALL_GIF)
+        )
 
     @classmethod
     def tearDownClass(cls):
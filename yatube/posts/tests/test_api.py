@@ -0,0 +1,178 @@
+from django.conf import settings
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .base_testcase import PostBaseTestCase
+from ..models import Follow, Post, TimelineEntry
+
+
+class FeedApiTests(PostBaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Пост {i}", group=cls.group)
+            for i in range(settings.POSTS_PER_PAGE + 3)
+        )
+        cls.API = {
+            "index": reverse("posts:api_index"),
+            "group": reverse(
+                "posts:api_group_list", kwargs={"slug": cls.group.slug}
+            ),
+            "profile": reverse(
+                "posts:api_profile", kwargs={"username": cls.user.username}
+            ),
+            "post": reverse(
+                "posts:api_post_detail", kwargs={"post_id": cls.post.pk}
+            ),
+            "follow": reverse("posts:api_follow_index"),
+        }
+
+    def _walk(self, client, url, **params):
+        seen = []
+        cursor = None
+        while True:
+            query = dict(params, cursor=cursor) if cursor else params
+            data = client.get(url, query).json()
+            seen.extend(data["results"])
+            cursor = data["next"]
+            if not cursor:
+                return seen
+
+    def test_feeds_walk_all_posts(self):
+        """Курсор проходит каждую ленту целиком в порядке сайта"""
+        expected = list(Post.objects.values_list("pk", flat=True))
+        for name in ("index", "group", "profile"):
+            with self.subTest(name=name):
+                seen = self._walk(self.client, self.API[name])
+                self.assertEqual([row["id"] for row in seen], expected)
+
+    def test_follow_feed(self):
+        """Лента подписок требует входа и отдаёт посты авторов"""
+        self.assertEqual(self.client.get(self.API["follow"]).status_code, 401)
+        Follow.objects.create(user=self.not_author, author=self.user)
+        seen = self._walk(
+            self.authorized_client_but_not_author,
+            self.API["follow"],
+            fields="id,author",
+        )
+        self.assertEqual(len(seen), Post.objects.count())
+        self.assertEqual(seen[0], {"id": seen[0]["id"], "author": "auth"})
+
+    def test_field_selection_and_compact_mode(self):
+        """?fields= выбирает поля, ?compact=1 отдаёт массивы значений"""
+        data = self.client.get(
+            self.API["post"], {"fields": "text,group,image"}
+        ).json()
+        self.assertEqual(
+            data,
+            {
+                "text": self.post.text,
+                "group": self.group.slug,
+                "image": settings.MEDIA_URL + self.IMAGE_URL,
+            },
+        )
+        response = self.client.get(
+            self.API["index"], {"fields": "id,author", "compact": "1"}
+        )
+        data = response.json()
+        self.assertEqual(data["fields"], ["id", "author"])
+        self.assertEqual(data["results"][0][1], self.user.username)
+        self.assertNotIn(b", ", response.content)
+
+    def test_unknown_field_and_missing_post(self):
+        """Неизвестное поле даёт 400, несуществующий пост - 404"""
+        response = self.client.get(self.API["index"], {"fields": "password"})
+        self.assertEqual(response.status_code, 400)
+        missing = reverse("posts:api_post_detail", kwargs={"post_id": 0})
+        self.assertEqual(self.client.get(missing).status_code, 404)
+
+    def test_feed_is_one_query(self):
+        """Страница ленты - один запрос без экземпляров моделей"""
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.API["index"])
+        self.assertEqual(len(queries), 1)
+
+
+class FollowApiTests(PostBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.follow_url = reverse(
+            "posts:api_follow", kwargs={"username": self.user.username}
+        )
+        self.unfollow_url = reverse(
+            "posts:api_unfollow", kwargs={"username": self.user.username}
+        )
+
+    def test_follow_and_unfollow(self):
+        """Подписка и отписка отвечают JSON с числом подписчиков"""
+        client = self.authorized_client_but_not_author
+        response = client.post(self.follow_url)
+        self.assertEqual(
+            response.json(), {"following": True, "follower_count": 1}
+        )
+        self.assertEqual(
+            client.post(self.follow_url).json()["follower_count"], 1
+        )
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.not_author).exists()
+        )
+        response = client.post(self.unfollow_url)
+        self.assertEqual(
+            response.json(), {"following": False, "follower_count": 0}
+        )
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.not_author).exists()
+        )
+
+    def test_follow_errors(self):
+        """Аноним получает 401, GET - 405, на себя подписаться нельзя"""
+        self.assertEqual(self.client.post(self.follow_url).status_code, 401)
+        self.assertEqual(
+            self.authorized_client_but_not_author.get(
+                self.follow_url
+            ).status_code,
+            405,
+        )
+        self.assertEqual(
+            self.authorized_client.post(self.follow_url).status_code, 400
+        )
+        self.assertFalse(Follow.objects.exists())
+
+    def test_unfollow_without_follow(self):
+        """Отписка без подписки не падает и не проверяет exists()"""
+        with CaptureQueriesContext(connection) as captured:
+            response = self.authorized_client_but_not_author.post(
+                self.unfollow_url
+            )
+        self.assertEqual(response.json()["following"], False)
+        follow_queries = [
+            query["sql"]
+            for query in captured.captured_queries
+            if 'FROM "posts_follow"' in query["sql"]
+        ]
+        self.assertEqual(len(follow_queries), 1)
+
+    def test_unfollow_existing_follow(self):
+        """Подписка удаляется одним DELETE, лента и счётчики обновляются"""
+        Follow.objects.create(user=self.not_author, author=self.user)
+        with CaptureQueriesContext(connection) as captured:
+            response = self.authorized_client_but_not_author.post(
+                self.unfollow_url
+            )
+        self.assertEqual(
+            response.json(), {"following": False, "follower_count": 0}
+        )
+        follow_queries = [
+            query["sql"]
+            for query in captured.captured_queries
+            if 'FROM "posts_follow"' in query["sql"]
+        ]
+        self.assertEqual(len(follow_queries), 1)
+        self.assertTrue(follow_queries[0].startswith("DELETE"))
+        self.assertFalse(Follow.objects.exists())
+        self.assertFalse(
+            TimelineEntry.objects.filter(user=self.not_author).exists()
+        )
@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import override_settings
+
+from .base_testcase import PostBaseTestCase, TEMP_MEDIA_ROOT
+from ..models import Follow, Post, User
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class BenchmarkTests(PostBaseTestCase):
+    def test_generate_and_benchmark(self):
+        """Генератор наполняет базу, замер пишет JSON и ловит регрессии"""
+        call_command(
+            "generate_data",
+            users=8,
+            posts=30,
+            comments=40,
+            groups=2,
+            follows=3,
+            image_ratio=0.2,
+            batch_size=7,
+            stdout=StringIO(),
+        )
+        self.assertEqual(
+            User.objects.filter(username__startswith="synthetic_").count(), 8
+        )
+        self.assertEqual(
+            Post.objects.filter(author__username__startswith="synthetic_")
+            .count(),
+            30,
+        )
+        self.assertTrue(Follow.objects.exists())
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, "result.json")
+            call_command(
+                "benchmark_views", repeat=2, output=output, stdout=StringIO()
+            )
+            with open(output, encoding="utf-8") as file:
+                results = json.load(file)
+            self.assertNotIn("delete", results)
+            self.assertIn("?q=", results["search"]["url"])
+            self.assertEqual(results["index"]["warm"]["status"], 200)
+            self.assertGreater(
+                results["index"]["cold"]["queries"],
+                results["index"]["warm"]["queries"],
+            )
+            for result in results.values():
+                result["cold"]["queries"] = 0
+            baseline = os.path.join(directory, "baseline.json")
+            with open(baseline, "w", encoding="utf-8") as file:
+                json.dump(results, file)
+            with self.assertRaisesMessage(CommandError, "запросов 0 ->"):
+                call_command(
+                    "benchmark_views",
+                    repeat=1,
+                    baseline=baseline,
+                    tolerance=1000,
+                    stdout=StringIO(),
+                )
@@ -0,0 +1,78 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+
+from .. import comment_buffer
+from ..comment_buffer import CommentBuffer
+from ..models import Comment, Post, User
+
+
+@override_settings(
+    COMMENT_BUFFER_CAPACITY=10,
+    COMMENT_BUFFER_BATCH=100,
+    COMMENT_BUFFER_FLUSH_MS=60000,
+)
+class CommentBufferTests(TransactionTestCase):
+    def setUp(self):
+        self.addCleanup(comment_buffer.shutdown)
+        self.user = User.objects.create_user(username="commenter")
+        self.post = Post.objects.create(author=self.user, text="Горячий")
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def test_buffered_comments_are_flushed_on_shutdown(self):
+        """Комментарии ждут в очереди и дописываются при остановке"""
+        url = reverse("posts:add_comment", kwargs={"post_id": self.post.pk})
+        for i in range(3):
+            response = self.client.post(url, {"text": f"Коммент {i}"})
+            self.assertEqual(response.status_code, 302)
+        self.assertFalse(Comment.objects.exists())
+        comment_buffer.shutdown()
+        self.assertEqual(Comment.objects.filter(post=self.post).count(), 3)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 3)
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        )
+        self.assertContains(response, "Коммент 2")
+
+    def test_full_or_stopped_buffer_writes_directly(self):
+        """Переполненный или остановленный буфер не теряет комментарий"""
+        buffer = CommentBuffer(capacity=1, batch_size=10, interval=60)
+        with mock.patch.object(CommentBuffer, "_ensure_started"):
+            comment = Comment(post=self.post, author=self.user, text="1")
+            self.assertTrue(buffer.submit(comment))
+            comment = Comment(post=self.post, author=self.user, text="2")
+            self.assertFalse(buffer.submit(comment))
+        buffer.stop()
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertFalse(buffer.submit(comment))
+
+    def test_flush_survives_deleted_post(self):
+        """Комментарий к удалённому посту не мешает записи остальных"""
+        doomed = Post.objects.create(author=self.user, text="Удалят")
+        comments = [
+            Comment(post=self.post, author=self.user, text="Останется"),
+            Comment(post=doomed, author=self.user, text="Пропадёт"),
+        ]
+        Post.objects.filter(pk=doomed.pk).delete()
+        with self.assertLogs("posts.comment_buffer", level="ERROR"):
+            CommentBuffer(10, 10, 1).flush(comments)
+        self.assertEqual(
+            list(Comment.objects.values_list("text", flat=True)),
+            ["Останется"],
+        )
+
+    def test_benchmark_command(self):
+        """Замер пишет комментарии в обоих режимах и убирает их"""
+        User.objects.create_user(username="second")
+        out = StringIO()
+        call_command(
+            "benchmark_comments", threads=2, per_thread=3, stdout=out
+        )
+        self.assertIn("direct", out.getvalue())
+        self.assertIn("buffered  записано 6", out.getvalue())
+        self.assertFalse(Comment.objects.exists())
@@ -0,0 +1,70 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from .base_testcase import PostBaseTestCase
+from ..models import Comment, Post, UserStats
+
+
+class CounterTests(PostBaseTestCase):
+    def _stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_post_create_and_delete_update_post_count(self):
+        """Создание и удаление поста меняют post_count автора"""
+        before = self._stats(self.user).post_count
+        self.authorized_client.post(
+            self.APP_NAME["create"], data={"text": "Счётчик"}
+        )
+        self.assertEqual(self._stats(self.user).post_count, before + 1)
+        post = Post.objects.get(text="Счётчик")
+        self.authorized_client.get(f"/delete/{post.pk}")
+        self.assertEqual(self._stats(self.user).post_count, before)
+
+    def test_comment_updates_comment_count(self):
+        """Комментарий увеличивает comment_count поста"""
+        self.authorized_client.post(
+            self.APP_NAME["comment"], data={"text": "Комментарий"}
+        )
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).comment_count,
+            Comment.objects.filter(post=self.post).count(),
+        )
+
+    def test_follow_and_unfollow_update_counts(self):
+        """Подписка и отписка меняют счётчики обеих сторон"""
+        self.authorized_client_but_not_author.get(
+            self.APP_NAME["profile_follow"]
+        )
+        self.assertEqual(self._stats(self.user).follower_count, 1)
+        self.assertEqual(self._stats(self.not_author).following_count, 1)
+        self.authorized_client_but_not_author.get(
+            self.APP_NAME["profile_unfollow"]
+        )
+        self.assertEqual(self._stats(self.user).follower_count, 0)
+        self.assertEqual(self._stats(self.not_author).following_count, 0)
+
+    def test_follow_refreshes_follower_profile(self):
+        """Подписка сбрасывает кеш страницы подписчика с числом подписок"""
+        url = reverse(
+            "posts:profile", kwargs={"username": self.not_author.username}
+        )
+        self.assertContains(self.client.get(url), "подписок: 0")
+        self.authorized_client_but_not_author.get(
+            self.APP_NAME["profile_follow"]
+        )
+        self.assertContains(self.client.get(url), "подписок: 1")
+
+    def test_reconcile_counters_repairs_drift(self):
+        """reconcile_counters исправляет рассинхронизацию"""
+        UserStats.objects.filter(user=self.user).update(post_count=42)
+        UserStats.objects.filter(user=self.not_author).delete()
+        Post.objects.filter(pk=self.post.pk).update(comment_count=7)
+        call_command("reconcile_counters", batch_size=1, stdout=StringIO())
+        self.assertEqual(
+            self._stats(self.user).post_count,
+            Post.objects.filter(author=self.user).count(),
+        )
+        self.assertEqual(self._stats(self.not_author).post_count, 0)
+        self.assertEqual(Post.objects.get(pk=self.post.pk).comment_count, 0)
@@ -0,0 +1,64 @@
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+
+from .base_testcase import PostBaseTestCase
+from ..models import Comment, Follow, Post
+
+
+class ExportTests(PostBaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Comment.objects.create(post=cls.post, author=cls.user, text="Да, ок")
+
+    def test_command_streams_ndjson(self):
+        """Команда выгружает по строке JSON на запись"""
+        out = StringIO()
+        call_command("export_data", "posts", chunk_size=1, stdout=out)
+        rows = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(len(rows), Post.objects.count())
+        self.assertEqual(rows[0]["text"], self.post.text)
+        self.assertEqual(rows[0]["pub_date"], self.post.pub_date.isoformat())
+
+    def test_command_writes_gzipped_csv(self):
+        """CSV со сжатием пишется в файл и читается обратно"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "comments.csv.gz")
+            call_command(
+                "export_data",
+                "comments",
+                export_format="csv",
+                gzip=True,
+                output=path,
+            )
+            with gzip.open(path, "rt", encoding="utf-8", newline="") as file:
+                rows = list(csv.reader(file))
+        self.assertEqual(
+            rows[0], ["id", "post_id", "author_id", "text", "pub_date"]
+        )
+        self.assertEqual(rows[1][3], "Да, ок")
+
+    def test_endpoint_is_staff_only_and_streams(self):
+        """Выгрузка по адресу доступна только персоналу"""
+        url = reverse("posts:export_data", kwargs={"table": "follows"})
+        response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.user.is_staff = True
+        self.user.save()
+        Follow.objects.create(user=self.not_author, author=self.user)
+        response = self.authorized_client.get(url, {"gzip": "1"})
+        self.assertTrue(response.streaming)
+        self.assertIn(".ndjson.gz", response["Content-Disposition"])
+        body = gzip.decompress(b"".join(response.streaming_content))
+        rows = [json.loads(line) for line in io.BytesIO(body)]
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]["user_id"], self.not_author.pk)
+        self.assertEqual(rows[0]["author_id"], self.user.pk)
@@ -0,0 +1,108 @@
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.test import SimpleTestCase, override_settings
+
+from core import files
+from core.storage import HashedMediaStorage
+
+MEDIA_ROOT = tempfile.mkdtemp()
+CONTENT = bytes(range(100))
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, FILE_OFFLOAD=None)
+class HashedFilesTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        storage = HashedMediaStorage(location=MEDIA_ROOT)
+        cls.hashed = storage.save("posts/clip.bin", ContentFile(CONTENT))
+        with open(os.path.join(MEDIA_ROOT, "posts", "plain.txt"), "w") as f:
+            f.write("без хеша")
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def test_name_follows_content(self):
+        """Имя несёт хеш содержимого, повторная загрузка - свой файл"""
+        storage = HashedMediaStorage(location=MEDIA_ROOT)
+        self.assertRegex(self.hashed, r"^posts/clip\.[0-9a-f]{12}\.bin$")
+        again = storage.save("posts/clip.bin", ContentFile(CONTENT))
+        self.addCleanup(storage.delete, again)
+        # Удаление одной копии не задевает другую.
+        self.assertNotEqual(again, self.hashed)
+        self.assertTrue(again.startswith(self.hashed[:-4]))
+        self.assertTrue(files.HASHED_NAME.search(again))
+        other = storage.save("posts/clip.bin", ContentFile(b"other"))
+        self.addCleanup(storage.delete, other)
+        self.assertNotEqual(other[:-4], self.hashed[:-4])
+        # Производный файл получает свой хеш вместо хеша исходника.
+        derived = storage.hashed_name(again, ContentFile(b"webp"))
+        self.assertRegex(derived, r"^posts/clip\.[0-9a-f]{12}\.bin$")
+
+    def test_cache_headers(self):
+        """Файл с хешем кешируется навсегда, без хеша - с проверкой"""
+        response = self.client.get(f"/media/{self.hashed}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(b"".join(response.streaming_content), CONTENT)
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertIn("max-age=31536000", response["Cache-Control"])
+        self.assertEqual(response["Accept-Ranges"], "bytes")
+        response.close()
+        response = self.client.get("/media/posts/plain.txt")
+        self.assertIn("no-cache", response["Cache-Control"])
+        response.close()
+        etag = response["ETag"]
+        response = self.client.get(
+            "/media/posts/plain.txt", HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_range_requests(self):
+        """Диапазон отдаётся с кодом 206, недостижимый - 416"""
+        url = f"/media/{self.hashed}"
+        response = self.client.get(url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response["Content-Range"], "bytes 10-19/100")
+        self.assertEqual(
+            b"".join(response.streaming_content), CONTENT[10:20]
+        )
+        response = self.client.get(url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(b"".join(response.streaming_content), CONTENT[-5:])
+        response = self.client.get(url, HTTP_RANGE="bytes=100-")
+        self.assertEqual(response.status_code, 416)
+        self.assertEqual(response["Content-Range"], "bytes */100")
+        # Другая версия файла в If-Range: отдаётся целиком.
+        response = self.client.get(
+            url, HTTP_RANGE="bytes=10-19", HTTP_IF_RANGE='"old"'
+        )
+        self.assertEqual(response.status_code, 200)
+        response.close()
+
+    def test_offload_to_web_server(self):
+        """При FILE_OFFLOAD байты отдаёт веб-сервер"""
+        with self.settings(FILE_OFFLOAD="x-accel-redirect"):
+            response = self.client.get(f"/media/{self.hashed}")
+        self.assertEqual(
+            response["X-Accel-Redirect"], f"/protected/media/{self.hashed}"
+        )
+        self.assertEqual(response.content, b"")
+        self.assertIn("immutable", response["Cache-Control"])
+        with self.settings(FILE_OFFLOAD="x-sendfile"):
+            response = self.client.get(f"/media/{self.hashed}")
+        self.assertEqual(
+            response["X-Sendfile"], os.path.join(MEDIA_ROOT, self.hashed)
+        )
+
+    def test_outside_root_is_not_found(self):
+        """Файлы вне корня и отсутствующие не отдаются"""
+        for path in ("../settings.py", "posts/missing.gif", "posts"):
+            with self.subTest(path=path):
+                response = self.client.get(f"/media/{path}")
+                self.assertEqual(response.status_code, 404)
+        response = self.client.post(f"/media/{self.hashed}")
+        self.assertEqual(response.status_code, 405)
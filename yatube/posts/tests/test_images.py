@@ -0,0 +1,109 @@
+import shutil
+from io import BytesIO
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .base_testcase import PostBaseTestCase, SMALL_GIF, TEMP_MEDIA_ROOT
+from .. import images
+from ..models import Post, User
+
+
+def camera_jpeg(size=(3000, 1000)):
+    """JPEG как с камеры: повёрнут тегом EXIF и несёт метаданные."""
+    exif = Image.Exif()
+    # Orientation = 6: при показе картинку нужно повернуть на 90°.
+    exif[0x0112] = 6
+    exif[0x010F] = "Camera"
+    buffer = BytesIO()
+    Image.new("RGB", size, (200, 10, 10)).save(
+        buffer, "JPEG", exif=exif.tobytes()
+    )
+    return buffer.getvalue()
+
+
+@override_settings(IMAGE_MAX_SIZE=1200, IMAGE_FORMAT="WEBP")
+class NormalizeTests(PostBaseTestCase):
+    def test_normalize_caps_rotates_and_strips(self):
+        """Картинка уменьшается, поворачивается и теряет EXIF"""
+        content = images.normalize(BytesIO(camera_jpeg()))
+        with Image.open(BytesIO(content)) as image:
+            self.assertEqual(image.format, "WEBP")
+            self.assertEqual(image.size, (400, 1200))
+            self.assertFalse(image.getexif())
+
+    def test_animation_and_normalized_files_are_kept(self):
+        """Анимацию и уже нормализованный файл не пересохраняем"""
+        frames = [Image.new("P", (4, 4), color) for color in (0, 1)]
+        buffer = BytesIO()
+        frames[0].save(
+            buffer, "GIF", save_all=True, append_images=frames[1:]
+        )
+        self.assertIsNone(images.normalize(BytesIO(buffer.getvalue())))
+        content = images.normalize(BytesIO(camera_jpeg((10, 10))))
+        self.assertIsNone(images.normalize(BytesIO(content)))
+
+    def test_post_switches_to_normalized_file(self):
+        """Пост переходит на новый файл, оригинал удаляется"""
+        post = Post.objects.create(
+            author=self.user,
+            text="Своя картинка",
+            image=SimpleUploadedFile(
+                "own.gif", SMALL_GIF, content_type="image/gif"
+            ),
+        )
+        original = post.image.name
+        created = post.updated_at
+        images.process(post.pk, original)
+        post.refresh_from_db()
+        # Фрагмент карточки поста с прежней картинкой устаревает.
+        self.assertGreater(post.updated_at, created)
+        self.assertRegex(post.image.name, r"^posts/own\.[0-9a-f]{12}\.webp$")
+        self.assertTrue(default_storage.exists(post.image.name))
+        self.assertFalse(default_storage.exists(original))
+
+    def test_replaced_image_is_not_overwritten(self):
+        """Картинку, заменённую до обработки, обработка не трогает"""
+        original = self.post.image.name
+        Post.objects.filter(pk=self.post.pk).update(image="posts/other.gif")
+        self.assertIsNone(images.normalize_post_image(self.post.pk, original))
+        self.assertEqual(
+            Post.objects.get(pk=self.post.pk).image.name, "posts/other.gif"
+        )
+        self.assertTrue(default_storage.exists(original))
+
+
+# Обработка запускается после фиксации транзакции с постом.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class UploadPipelineTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_created_post_gets_normalized_image(self):
+        """Загруженная при создании поста картинка нормализуется"""
+        user = User.objects.create_user(username="uploader")
+        client = Client()
+        client.force_login(user)
+        client.post(
+            reverse("posts:post_create"),
+            {
+                "text": "С камеры",
+                "image": SimpleUploadedFile(
+                    "photo.jpg", camera_jpeg(), content_type="image/jpeg"
+                ),
+            },
+        )
+        post = Post.objects.get(author=user)
+        self.assertRegex(
+            post.image.name, r"^posts/photo\.[0-9a-f]{12}\.webp$"
+        )
+        with default_storage.open(post.image.name) as file:
+            with Image.open(file) as image:
+                width, height = image.size
+        # Снимок повёрнут по EXIF: теперь он вертикальный.
+        self.assertLess(width, height)
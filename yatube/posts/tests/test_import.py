@@ -0,0 +1,90 @@
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+
+from .base_testcase import PostBaseTestCase
+from ..models import Comment, Follow, Post, TimelineEntry, User, UserStats
+from ..search import search_posts
+
+
+class ImportDataTests(PostBaseTestCase):
+    def _import(self, table, name, content, **options):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, name)
+            with open(path, "w", encoding="utf-8") as file:
+                file.write(content)
+            out = StringIO()
+            call_command("import_data", table, path, stdout=out, **options)
+        return out.getvalue()
+
+    def test_import_all_tables(self):
+        """Загрузка пачками с поиском авторов и групп по словарям"""
+        self._import(
+            "users",
+            "users.csv",
+            "username,first_name\nreader,Читатель\nwriter,Писатель\n",
+            batch_size=1,
+        )
+        writer = User.objects.get(username="writer")
+        self.assertEqual(writer.first_name, "Писатель")
+        self.assertFalse(writer.has_usable_password())
+        self._import(
+            "follows",
+            "follows.ndjson",
+            '{"user": "reader", "author": "writer"}\n'
+            '{"user": "reader", "author": "writer"}\n'
+            '{"user": "reader", "author": "nobody"}\n',
+        )
+        self.assertEqual(Follow.objects.filter(author=writer).count(), 1)
+        out = self._import(
+            "posts",
+            "posts.ndjson",
+            '{"id": 500, "author": "writer", "group": "test-slug", '
+            '"text": "Старый пост", "pub_date": "2020-01-02T03:04:05+00:00"}\n'
+            '{"author": "writer", "group": "missing", "text": "Мимо"}\n',
+            batch_size=1,
+        )
+        self.assertIn("Обработано записей: 2, пропущено: 1", out)
+        post = Post.objects.get(pk=500)
+        self.assertEqual(post.group, self.group)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(UserStats.objects.get(user=writer).post_count, 1)
+        self.assertIn(post, search_posts("старый"))
+        self.assertTrue(
+            TimelineEntry.objects.filter(
+                user__username="reader", post=post
+            ).exists()
+        )
+        self._import(
+            "comments",
+            "comments.csv",
+            "post_id,author,text\n500,reader,Первый\n500,reader,Второй\n",
+        )
+        self.assertEqual(Comment.objects.filter(post=post).count(), 2)
+        self.assertEqual(Post.objects.get(pk=500).comment_count, 2)
+
+    def test_posts_fan_out_only_their_batch(self):
+        """Пачка постов попадает в ленты, история автора не перечитывается"""
+        reader = User.objects.create_user(username="reader")
+        Follow.objects.create(user=reader, author=self.user)
+        TimelineEntry.objects.filter(user=reader).delete()
+        self._import(
+            "posts",
+            "posts.ndjson",
+            '{"author": "auth", "text": "Первый", '
+            '"pub_date": "2020-01-02T03:04:05+00:00"}\n'
+            '{"author": "auth", "text": "Второй"}\n',
+            batch_size=1,
+        )
+        self.assertEqual(
+            set(
+                TimelineEntry.objects.filter(user=reader).values_list(
+                    "post__text", flat=True
+                )
+            ),
+            {"Первый", "Второй"},
+        )
+        self.assertEqual(Post.objects.get(text="Первый").pub_date.year, 2020)
+        self.assertTrue(Post._meta.get_field("pub_date").auto_now_add)
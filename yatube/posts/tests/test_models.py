@@ -1,4 +1,7 @@
+from io import StringIO
+
 from django.conf import settings
+from django.core.management import call_command
 
 from .base_testcase import PostBaseTestCase
 
@@ -40,3 +43,7 @@ class PostModelTest(PostBaseTestCase):
                 self.assertEqual(
                     post._meta.get_field(value).help_text, expected
                 )
+
+    def test_hot_queries_use_indexes(self):
+        """Запросы лент обходятся без полного сканирования и сортировки."""
+        call_command("explain_feeds", stdout=StringIO())
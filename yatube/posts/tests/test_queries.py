@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from .base_testcase import PostBaseTestCase
+from .. import timeline
+from ..models import Comment, Follow, Post
+
+# Максимум запросов на страницу для авторизованного пользователя,
+# включая чтение сессии и пользователя.
+QUERY_BUDGET = {
+    "index": 3,
+    "group": 4,
+    "profile": 5,
+    "follow": 3,
+    "post": 5,
+}
+
+
+class QueryBudgetTests(PostBaseTestCase):
+    def setUp(self):
+        super().setUp()
+        # Метаданные миниатюр sorl читаются отдельно, здесь их не считаем.
+        Post.objects.filter(pk=self.post.pk).update(image="")
+        Post.objects.create(author=self.not_author, text="Пост подписки")
+        Follow.objects.create(user=self.user, author=self.not_author)
+        Comment.objects.create(
+            post=self.post, author=self.not_author, text="Комментарий"
+        )
+
+    def _count_queries(self, name):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_client.get(self.APP_NAME[name])
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def _fill_page(self):
+        for author, group in (
+            (self.user, self.group),
+            (self.not_author, self.group_1),
+        ):
+            Post.objects.bulk_create(
+                Post(author=author, text=f"Пост {i}", group=group)
+                for i in range(settings.POSTS_PER_PAGE)
+            )
+        # bulk_create не шлёт сигналы, ленту подписок собираем вручную.
+        timeline.rebuild(self.user.pk)
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.not_author, text=f"К {i}")
+            for i in range(settings.POSTS_PER_PAGE)
+        )
+
+    def test_query_count_does_not_grow_with_page(self):
+        """Число запросов не зависит от количества постов на странице"""
+        single = {name: self._count_queries(name) for name in QUERY_BUDGET}
+        self._fill_page()
+        for name, budget in QUERY_BUDGET.items():
+            with self.subTest(name=name):
+                full = self._count_queries(name)
+                self.assertEqual(full, single[name])
+                self.assertLessEqual(full, budget)
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase
+from django.urls import reverse
+
+from core.cache import GENERATION_KEY, bump_generations
+from core.db import PIN_COOKIE, REPLICA, ReplicaRouter, sync_replica
+from ..cache import SITE, author_scope
+from ..models import Post, User
+
+
+class ReplicaRoutingTests(TransactionTestCase):
+    """Две базы SQLite: основная тестовая и её копия через backup API"""
+
+    def setUp(self):
+        cache.clear()
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        connections.databases[REPLICA] = dict(
+            connections["default"].settings_dict,
+            NAME=os.path.join(directory, "replica.sqlite3"),
+        )
+        self.addCleanup(self._drop_replica)
+        self.user = User.objects.create_user(username="writer")
+        Post.objects.create(author=self.user, text="Есть на реплике")
+        sync_replica()
+        # bulk_create не шлёт сигналов: реплика отстала, а поколения
+        # областей выглядят давними.
+        Post.objects.bulk_create(
+            [Post(author=self.user, text="Только в основной")]
+        )
+        cache.set_many(
+            {
+                GENERATION_KEY.format(scope): 1
+                for scope in (SITE, author_scope(self.user.username))
+            },
+            timeout=None,
+        )
+        self.index = reverse("posts:index")
+
+    def _drop_replica(self):
+        connections[REPLICA].close()
+        del connections.databases[REPLICA]
+        if hasattr(connections._connections, REPLICA):
+            delattr(connections._connections, REPLICA)
+
+    def test_feed_reads_from_replica(self):
+        """Лента читается из реплики, запись идёт в основную базу"""
+        content = self.client.get(self.index).content.decode()
+        self.assertIn("Есть на реплике", content)
+        self.assertNotIn("Только в основной", content)
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Post), "default")
+        self.assertFalse(router.allow_migrate(REPLICA, "posts"))
+
+    def test_pinned_client_reads_primary(self):
+        """С cookie закрепления лента читается из основной базы"""
+        self.client.cookies[PIN_COOKIE] = "1"
+        content = self.client.get(self.index).content.decode()
+        self.assertIn("Только в основной", content)
+
+    def test_recently_changed_scope_reads_primary(self):
+        """Недавно изменённые области читаются из основной базы"""
+        bump_generations([SITE])
+        content = self.client.get(self.index).content.decode()
+        self.assertIn("Только в основной", content)
+
+    def test_write_pins_client(self):
+        """После записи клиент получает cookie закрепления"""
+        reader = User.objects.create_user(username="reader")
+        self.client.force_login(reader)
+        response = self.client.get(
+            reverse(
+                "posts:profile_follow",
+                kwargs={"username": self.user.username},
+            )
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+        response = self.client.get(self.index)
+        self.assertNotIn(PIN_COOKIE, response.cookies)
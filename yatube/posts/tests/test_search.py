@@ -0,0 +1,67 @@
+from django.conf import settings
+from django.contrib.admin.sites import site
+from django.test import RequestFactory
+from django.urls import reverse
+
+from .base_testcase import PostBaseTestCase
+from ..models import Post
+from ..search import search_posts
+
+
+class SearchTests(PostBaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.search_url = reverse("posts:search")
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Кошки и собаки {i}")
+            for i in range(settings.POSTS_PER_PAGE + 3)
+        )
+        cls.best = Post.objects.create(
+            author=cls.user, text="кошка кошка кошка"
+        )
+
+    def test_index_follows_changes(self):
+        """Индекс обновляется при создании, правке и удалении поста"""
+        post = Post.objects.create(author=self.user, text="Жираф")
+        self.assertIn(post, search_posts("жираф"))
+        Post.objects.filter(pk=post.pk).update(text="Слон")
+        self.assertFalse(search_posts("жираф").exists())
+        self.assertIn(post, search_posts("слон"))
+        post.delete()
+        self.assertFalse(search_posts("слон").exists())
+
+    def test_query_syntax_is_not_fts_syntax(self):
+        """Кавычки и операторы FTS5 в запросе не ломают поиск"""
+        for query in ('"кошки', "NOT AND", "кошки*)(", "", "!!!"):
+            with self.subTest(query=query):
+                response = self.client.get(self.search_url, {"q": query})
+                self.assertEqual(response.status_code, 200)
+
+    def test_search_ranks_and_pages_results(self):
+        """Результаты идут по релевантности и листаются курсором"""
+        response = self.client.get(self.search_url, {"q": "кошк"})
+        page_obj = response.context["page_obj"]
+        self.assertEqual(page_obj[0], self.best)
+        seen = list(page_obj)
+        cursor = page_obj.paginator.next_cursor
+        self.assertContains(response, "?q=%D0%BA%D0%BE%D1%88%D0%BA&cursor=")
+        while cursor:
+            page_obj = self.client.get(
+                self.search_url, {"q": "кошк", "cursor": cursor}
+            ).context["page_obj"]
+            seen.extend(page_obj)
+            cursor = page_obj.paginator.next_cursor
+        self.assertEqual(len(seen), len(set(seen)))
+        self.assertEqual(len(seen), settings.POSTS_PER_PAGE + 4)
+        self.assertNotIn(self.post, seen)
+
+    def test_admin_search_uses_index(self):
+        """Поиск в админке идёт через тот же индекс"""
+        admin = site._registry[Post]
+        request = RequestFactory().get("/admin/posts/post/")
+        queryset, distinct = admin.get_search_results(
+            request, Post.objects.all(), "собаки"
+        )
+        self.assertFalse(distinct)
+        self.assertEqual(queryset.count(), settings.POSTS_PER_PAGE + 3)
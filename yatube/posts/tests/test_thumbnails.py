@@ -0,0 +1,134 @@
+import os
+import shutil
+from io import StringIO
+
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from .base_testcase import PostBaseTestCase, SMALL_GIF, TEMP_MEDIA_ROOT
+from .. import thumbnails
+from ..models import Post, User
+
+
+def thumbnail_files():
+    cache_dir = os.path.join(TEMP_MEDIA_ROOT, "cache")
+    return [files for _, _, files in os.walk(cache_dir) if files]
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ThumbnailTests(PostBaseTestCase):
+    def test_pregenerate_builds_thumbnail(self):
+        """Миниатюра строится до первого показа страницы"""
+        self.assertTrue(thumbnails.pregenerate(self.post.image.name))
+        self.assertTrue(thumbnail_files())
+
+    def _image_posts(self, count):
+        posts = []
+        for number in range(count):
+            post = Post.objects.create(
+                author=self.user,
+                text=f"Картинка {number}",
+                image=SimpleUploadedFile(
+                    name=f"prefetch_{number}.gif",
+                    content=SMALL_GIF,
+                    content_type="image/gif",
+                ),
+            )
+            thumbnails.pregenerate(post.image.name)
+            posts.append(Post.objects.get(pk=post.pk))
+        return posts
+
+    def test_prefetch_reads_metadata_in_one_query(self):
+        """Метаданные миниатюр страницы читаются одним запросом"""
+        posts = self._image_posts(3)
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails.prefetch(posts)
+        self.assertEqual(len(queries), 1)
+        for post in posts:
+            expected = get_thumbnail(
+                post.image, thumbnails.GEOMETRY, **thumbnails.OPTIONS
+            )
+            self.assertEqual(post.thumbnail.name, expected.name)
+        with CaptureQueriesContext(connection) as queries:
+            thumbnails.prefetch(posts)
+        self.assertEqual(len(queries), 0)
+
+    def test_feed_serves_renditions_with_srcset(self):
+        """Лента отдаёт srcset всех ширин, лениво грузит не первую"""
+        self._image_posts(2)
+        posts = Post.objects.exclude(image="").order_by("-pub_date", "-pk")
+        newest = posts.first()
+        thumbnails.prefetch([newest])
+        widths = [im.width for im in newest.renditions]
+        self.assertEqual(widths, list(thumbnails.WIDTHS))
+        cache.clear()
+        content = self.client.get(self.APP_NAME["index"]).content.decode()
+        self.assertEqual(content.count("srcset="), posts.count())
+        self.assertIn(" 320w, ", content)
+        self.assertRegex(content, r'width="960"\s+height="339"')
+        # Высота по ширине блока, иначе 339px растягивают картинку.
+        self.assertIn("card-img h-auto", content)
+        first, rest = content.split("</article>", 1)
+        self.assertNotIn('loading="lazy"', first)
+        self.assertIn('loading="lazy"', rest)
+        detail = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": self.post.pk})
+        ).content.decode()
+        self.assertIn("srcset=", detail)
+        self.assertNotIn('loading="lazy"', detail)
+
+    def test_detail_falls_back_to_thumbnail(self):
+        """Без размеров миниатюр пост показывает картинку без srcset"""
+        post = Post.objects.create(
+            author=self.user, text="Без файла", image="posts/missing.gif"
+        )
+        response = self.client.get(
+            reverse("posts:post_detail", kwargs={"post_id": post.pk})
+        )
+        self.assertEqual(response.context["post"].renditions, [])
+        self.assertNotContains(response, "srcset=")
+        self.assertContains(
+            response, response.context["post"].thumbnail.url
+        )
+
+
+# Потоки пула пишут в БД сами, поэтому тест без общей транзакции.
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class GenerateThumbnailsCommandTests(TransactionTestCase):
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def test_generate_thumbnails_command(self):
+        """Команда строит миниатюры всех постов и печатает прогресс"""
+        user = User.objects.create_user(username="thumbs")
+        for name in ("one.gif", "two.gif"):
+            Post.objects.create(
+                author=user,
+                text=name,
+                image=SimpleUploadedFile(
+                    name=name,
+                    content=SMALL_GIF,
+                    content_type="image/gif",
+                ),
+            )
+        out = StringIO()
+        # Тестовая база SQLite в памяти с общим кешем не ждёт блокировку,
+        # а сразу отказывает параллельной записи в хранилище sorl.
+        call_command("generate_thumbnails", workers=1, stdout=out)
+        self.assertIn("2/2, ошибок: 0", out.getvalue())
+        self.assertTrue(thumbnail_files())
+        names = Post.objects.values_list("image", flat=True)
+        self.assertEqual(thumbnails.missing(names), [])
+        # Повторный запуск ничего не строит заново.
+        out = StringIO()
+        call_command("generate_thumbnails", stdout=out)
+        self.assertIn("Миниатюр готово: 0 из 0", out.getvalue())
@@ -0,0 +1,89 @@
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TransactionTestCase
+
+from .base_testcase import PostBaseTestCase
+from .. import timeline
+from ..models import Follow, Post, TimelineEntry
+
+
+class TimelineTests(PostBaseTestCase):
+    def _timeline_posts(self, user):
+        return list(
+            TimelineEntry.objects.filter(user=user).values_list(
+                "post_id", flat=True
+            )
+        )
+
+    def test_follow_backfills_timeline(self):
+        """Подписка добавляет в ленту прошлые посты автора"""
+        self.authorized_client_but_not_author.get(
+            self.APP_NAME["profile_follow"]
+        )
+        self.assertEqual(self._timeline_posts(self.not_author), [self.post.pk])
+
+    def test_new_post_fans_out_to_followers(self):
+        """Новый пост попадает в ленты подписчиков автора"""
+        Follow.objects.create(user=self.not_author, author=self.user)
+        post = Post.objects.create(author=self.user, text="Новый пост")
+        self.assertEqual(
+            self._timeline_posts(self.not_author), [post.pk, self.post.pk]
+        )
+
+    def test_unfollow_prunes_timeline(self):
+        """Отписка убирает посты автора из ленты"""
+        Follow.objects.create(user=self.not_author, author=self.user)
+        self.authorized_client_but_not_author.get(
+            self.APP_NAME["profile_unfollow"]
+        )
+        self.assertEqual(self._timeline_posts(self.not_author), [])
+
+    def test_check_and_rebuild(self):
+        """Проверка находит расхождения, пересборка их устраняет"""
+        Follow.objects.create(user=self.not_author, author=self.user)
+        TimelineEntry.objects.filter(user=self.not_author).delete()
+        self.assertEqual(
+            timeline.check(self.not_author.pk), ({self.post.pk}, set())
+        )
+        with self.assertRaises(CommandError):
+            call_command("check_timeline", stdout=StringIO())
+        call_command("rebuild_timeline", stdout=StringIO())
+        self.assertEqual(timeline.check(self.not_author.pk), (set(), set()))
+
+
+class TimelineMigrationTests(TransactionTestCase):
+    before = [("posts", "0008_auto_20221016_1051")]
+    after = [("posts", "0009_timelineentry")]
+
+    def tearDown(self):
+        # Возвращаем схему к последней миграции для остальных тестов.
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_migration_fills_existing_timelines(self):
+        """Миграция заполняет ленты существующих подписчиков"""
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.before)
+        apps = executor.loader.project_state(self.before).apps
+        User = apps.get_model("auth", "User")
+        reader = User.objects.create(username="reader")
+        author = User.objects.create(username="author")
+        post = apps.get_model("posts", "Post").objects.create(
+            author=author, text="До миграции"
+        )
+        apps.get_model("posts", "Follow").objects.create(
+            user=reader, author=author
+        )
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.after)
+        apps = executor.loader.project_state(self.after).apps
+        entries = apps.get_model("posts", "TimelineEntry").objects.filter(
+            user_id=reader.pk
+        )
+        self.assertEqual(
+            list(entries.values_list("post_id", flat=True)), [post.pk]
+        )
@@ -0,0 +1,45 @@
+import json
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from core import timing
+from .base_testcase import PostBaseTestCase
+
+
+class ServerTimingTests(PostBaseTestCase):
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=1)
+    def test_sampled_request_gets_header_and_log_line(self):
+        """Замеренный запрос получает Server-Timing и строку журнала"""
+        with self.assertLogs("core.timing", level="INFO") as logs:
+            response = self.authorized_client.get(self.APP_NAME["post"])
+            cached = self.authorized_client.get(self.APP_NAME["post"])
+        header = response["Server-Timing"]
+        for metric in ("db;dur=", "tpl;dur=", "cache;desc=", "total;dur="):
+            self.assertIn(metric, header)
+        line, _ = logs.records
+        record = json.loads(line.getMessage())
+        self.assertEqual(record["path"], self.APP_NAME["post"])
+        self.assertGreater(record["db_queries"], 0)
+        self.assertGreater(record["template_ms"], 0)
+        self.assertGreater(record["cache_misses"], 0)
+        self.assertIn('SQL"', cached["Server-Timing"])
+        self.assertNotIn("hit 0,", cached["Server-Timing"])
+
+    @override_settings(SERVER_TIMING_SAMPLE_RATE=0)
+    def test_unsampled_request_has_no_header(self):
+        """Без выборки заголовок не добавляется"""
+        response = self.client.get(self.APP_NAME["index"])
+        self.assertFalse(response.has_header("Server-Timing"))
+
+    def test_get_many_counts_each_key_once(self):
+        """get_many через get бэкенда не считает ключи дважды"""
+        timing.instrument()
+        cache.set("timing-a", 1)
+        metrics = timing.Metrics()
+        token = timing._metrics.set(metrics)
+        try:
+            cache.get_many(["timing-a", "timing-b", "timing-c"])
+        finally:
+            timing._metrics.reset(token)
+        self.assertEqual((metrics.cache_hits, metrics.cache_misses), (1, 2))
@@ -3,10 +3,16 @@ import math
 from django import forms
 from django.conf import settings
 from django.core.cache import cache
-from django.test import Client
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 
+from core.cache import bump_generations
+from core.paginator import CachedCountPaginator
 from .base_testcase import PostBaseTestCase
-from ..models import Follow, User, Group, Post
+from ..cache import SITE
+from ..models import Comment, Follow, User, Group, Post
 
 
 class PostViewTests(PostBaseTestCase):
@@ -113,17 +119,12 @@ class PostViewTests(PostBaseTestCase):
             author=self.user,
             text="Проверка хеширования",
         )
-        count_posts = Post.objects.count()
         response_1 = self.authorized_client.get(self.APP_NAME["index"])
         cached_response_content = response_1.content
-        post.delete()
-        response_after_delete = self.authorized_client.get(
-            self.APP_NAME["index"]
-        )
-        self.assertEqual(Post.objects.count(), count_posts - 1)
-        self.assertEqual(
-            cached_response_content, response_after_delete.content
-        )
+        # update() не шлёт сигналов, поэтому кеш не инвалидируется.
+        Post.objects.filter(pk=post.pk).update(text="Изменено в обход")
+        response_2 = self.authorized_client.get(self.APP_NAME["index"])
+        self.assertEqual(cached_response_content, response_2.content)
         cache.clear()
         response_after_clear = self.authorized_client.get(
             self.APP_NAME["index"]
@@ -132,6 +133,37 @@ class PostViewTests(PostBaseTestCase):
             cached_response_content, response_after_clear.content
         )
 
+    def test_cache_invalidated_on_change(self):
+        """Изменение данных сразу видно на закешированных страницах"""
+        pages = ("index", "group", "profile", "post")
+        for name in pages:
+            self.authorized_client.get(self.APP_NAME[name])
+        Post.objects.create(
+            author=self.user, text="Свежий пост", group=self.group
+        )
+        self.group.title = "Новое название группы"
+        self.group.save()
+        for name in pages:
+            with self.subTest(name=name):
+                response = self.authorized_client.get(self.APP_NAME[name])
+                self.assertIsNotNone(response.context)
+        Post.objects.get(pk=self.post.pk).delete()
+        response = self.authorized_client.get(self.APP_NAME["post"])
+        self.assertEqual(response.status_code, 404)
+
+    def test_post_fragment_cached_until_post_changes(self):
+        """Карточка поста берётся из кеша, пока пост не изменён"""
+        post = Post.objects.get(pk=self.post.pk)
+        self.authorized_client.get(self.APP_NAME["index"])
+        Post.objects.filter(pk=post.pk).update(text="Без сигналов")
+        bump_generations([SITE])
+        response = self.authorized_client.get(self.APP_NAME["index"])
+        self.assertContains(response, post.text)
+        post.text = "Сохранено через save"
+        post.save()
+        response = self.authorized_client.get(self.APP_NAME["index"])
+        self.assertContains(response, "Сохранено через save")
+
     def test_follow(self):
         """Тест подписки"""
         count_befor_follow = Follow.objects.all().count()
@@ -249,6 +281,227 @@ class PaginatorViewsTest(PostBaseTestCase):
                     )
 
 
+class CachedCountPaginatorTest(PostBaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Пост {i}", group=cls.group)
+            for i in range(settings.POSTS_PER_PAGE * 2)
+        )
+
+    def _count_queries(self, url):
+        with CaptureQueriesContext(connection) as captured:
+            response = self.authorized_client.get(url)
+        counts = [
+            query
+            for query in captured.captured_queries
+            if "COUNT(*)" in query["sql"]
+        ]
+        return response, len(counts)
+
+    def test_page_window(self):
+        """Ссылки только на соседние, первую и последнюю страницы"""
+        paginator = CachedCountPaginator(range(1000), 10)
+        self.assertEqual(
+            paginator.page(50).page_window,
+            [1, None, 48, 49, 50, 51, 52, None, 100],
+        )
+        self.assertEqual(
+            paginator.page(2).page_window, [1, 2, 3, 4, None, 100]
+        )
+        self.assertEqual(
+            CachedCountPaginator(range(50), 10).page(3).page_window,
+            [1, 2, 3, 4, 5],
+        )
+
+    def test_count_is_cached_per_feed(self):
+        """COUNT(*) ленты выполняется один раз до изменения данных"""
+        cache.clear()
+        url = self.APP_NAME["group"] + "?page=2"
+        response, counts = self._count_queries(url)
+        self.assertEqual(counts, 1)
+        self.assertEqual(response.context["page_obj"].paginator.count, 21)
+        # Другая страница той же ленты берёт число из кеша.
+        _, counts = self._count_queries(self.APP_NAME["group"] + "?page=3")
+        self.assertEqual(counts, 0)
+        Post.objects.create(author=self.user, text="Ещё", group=self.group)
+        response, counts = self._count_queries(url)
+        self.assertEqual(counts, 1)
+        self.assertEqual(response.context["page_obj"].paginator.count, 22)
+
+    @override_settings(APPROXIMATE_COUNT_THRESHOLD=1)
+    def test_approximate_count_for_whole_table(self):
+        """Главная без условий берёт число строк из статистики SQLite"""
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE posts_post")
+        cache.clear()
+        response, counts = self._count_queries(
+            self.APP_NAME["index"] + "?page=1"
+        )
+        paginator = response.context["page_obj"].paginator
+        self.assertEqual(counts, 0)
+        self.assertTrue(paginator.approximate)
+        self.assertEqual(paginator.count, Post.objects.count())
+        # В ленте группы есть условие, поэтому она считает точно.
+        cache.clear()
+        _, counts = self._count_queries(self.APP_NAME["group"] + "?page=1")
+        self.assertEqual(counts, 1)
+
+
+class CursorPaginatorViewsTest(PostBaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        Post.objects.all().delete()
+        cls.number_of_posts = 23
+        Post.objects.bulk_create(
+            Post(author=cls.user, text=f"Пост {i}", group=cls.group)
+            for i in range(cls.number_of_posts)
+        )
+
+    def test_cursor_walks_whole_feed(self):
+        """По курсорам вперёд проходится вся лента без повторов"""
+        expected = list(Post.objects.order_by("-pub_date", "-pk"))
+        for name in ("index", "group", "profile"):
+            with self.subTest(name=name):
+                cache.clear()
+                seen = []
+                url = self.APP_NAME[name]
+                while url:
+                    page_obj = self.authorized_client.get(url).context[
+                        "page_obj"
+                    ]
+                    seen.extend(page_obj.object_list)
+                    cursor = page_obj.paginator.next_cursor
+                    url = cursor and f"{self.APP_NAME[name]}?cursor={cursor}"
+                self.assertEqual(seen, expected)
+
+    def test_cursor_previous_returns_same_page(self):
+        """Курсор назад возвращает предыдущую страницу"""
+        first = self.authorized_client.get(self.APP_NAME["profile"])
+        first_page = first.context["page_obj"]
+        self.assertIsNone(first_page.paginator.previous_cursor)
+        second = self.authorized_client.get(
+            self.APP_NAME["profile"]
+            + f"?cursor={first_page.paginator.next_cursor}"
+        )
+        back = self.authorized_client.get(
+            self.APP_NAME["profile"]
+            + f"?cursor={second.context['page_obj'].paginator.previous_cursor}"
+        )
+        self.assertEqual(
+            list(back.context["page_obj"]), list(first_page.object_list)
+        )
+
+    def test_bad_cursor_shows_first_page(self):
+        """Испорченный курсор открывает первую страницу"""
+        response = self.authorized_client.get(
+            self.APP_NAME["group"] + "?cursor=broken"
+        )
+        self.assertEqual(
+            len(response.context["page_obj"]), settings.POSTS_PER_PAGE
+        )
+
+
+class CommentPagesTest(PostBaseTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.number_of_comments = settings.COMMENTS_PER_PAGE * 2 + 5
+        Comment.objects.bulk_create(
+            Comment(post=cls.post, author=cls.user, text=f"Комментарий {i}")
+            for i in range(cls.number_of_comments)
+        )
+        cls.comments_url = reverse(
+            "posts:post_comments", kwargs={"post_id": cls.post.pk}
+        )
+
+    def test_post_detail_shows_first_comments(self):
+        """На странице поста только первая пачка комментариев"""
+        response = self.client.get(self.APP_NAME["post"])
+        comments = response.context["comments"]
+        self.assertEqual(
+            list(comments),
+            list(Comment.objects.all()[: settings.COMMENTS_PER_PAGE]),
+        )
+        next_url = f"?after={comments.paginator.next_cursor}"
+        self.assertContains(response, self.comments_url + next_url)
+
+    def test_load_more_walks_all_comments(self):
+        """Курсор ?after= отдаёт остальные комментарии без повторов"""
+        first = self.client.get(self.APP_NAME["post"]).context["comments"]
+        seen = [comment.pk for comment in first]
+        cursor = first.paginator.next_cursor
+        while cursor:
+            data = self.client.get(
+                self.comments_url, {"after": cursor, "format": "json"}
+            ).json()
+            seen.extend(comment["id"] for comment in data["comments"])
+            cursor = data["next"]
+        self.assertEqual(
+            seen, list(Comment.objects.values_list("pk", flat=True))
+        )
+
+    def test_load_more_returns_html_fragment(self):
+        """Без format=json отдаётся HTML-фрагмент со следующей кнопкой"""
+        first = self.client.get(self.APP_NAME["post"]).context["comments"]
+        response = self.client.get(
+            self.comments_url, {"after": first.paginator.next_cursor}
+        )
+        self.assertTemplateUsed(response, "posts/includes/comment_list.html")
+        self.assertEqual(
+            len(response.context["comments"]), settings.COMMENTS_PER_PAGE
+        )
+        self.assertContains(response, "Показать ещё")
+
+
+class ConditionalGetTest(PostBaseTestCase):
+    def test_unchanged_page_answers_not_modified(self):
+        """Повторный запрос с ETag без изменений получает 304"""
+        for name in ("index", "group", "profile", "post"):
+            with self.subTest(name=name):
+                url = self.APP_NAME[name]
+                # Страница с формой выдаёт CSRF cookie, а она входит
+                # в ETag: сравнивается второй ответ.
+                self.client.get(url)
+                first = self.client.get(url)
+                self.assertIn("no-cache", first["Cache-Control"])
+                self.assertFalse(first.has_header("Last-Modified"))
+                again = self.client.get(
+                    url, HTTP_IF_NONE_MATCH=first["ETag"]
+                )
+                self.assertEqual(again.status_code, 304)
+
+    def test_change_or_other_user_gets_full_page(self):
+        """После правки или для другого пользователя страница отдаётся"""
+        url = self.APP_NAME["post"]
+        etag = self.client.get(url)["ETag"]
+        response = self.authorized_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header("Last-Modified"))
+        self.authorized_client.post(
+            self.APP_NAME["comment"], data={"text": "Новый комментарий"}
+        )
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_new_csrf_token_gets_full_page(self):
+        """После повторного входа страница с новым CSRF-токеном отдаётся"""
+        url = self.APP_NAME["post"]
+        client = self.authorized_client
+        client.get(url)
+        etag = client.get(url)["ETag"]
+        self.assertEqual(
+            client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304
+        )
+        client.logout()
+        client.force_login(self.user)
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
 class PageContainsPostTest(PostBaseTestCase):
     def test_index_page_post_have(self):
         response = self.authorized_client.get(self.APP_NAME["index"])
@@ -0,0 +1,48 @@
+import importlib
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import connections
+from django.test import override_settings
+
+from .base_testcase import PostBaseTestCase
+
+
+@override_settings(WARMUP_HOST="testserver")
+class WarmUpTests(PostBaseTestCase):
+    def assert_served_from_cache(self, name):
+        # Из кеша страница приходит без контекста шаблона.
+        response = self.client.get(self.APP_NAME[name])
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context)
+
+    @override_settings(SHARED_CACHE=True)
+    def test_command_compiles_templates_and_primes_pages(self):
+        """С общим кешем команда кладёт страницы в кеш"""
+        out = StringIO()
+        call_command("warm_up", stdout=out)
+        self.assertIn("200  /group/test-slug/", out.getvalue())
+        self.assertRegex(out.getvalue(), r"Шаблонов: [1-9]\d*")
+        self.assert_served_from_cache("index")
+        self.assert_served_from_cache("group")
+
+    @override_settings(SHARED_CACHE=False)
+    def test_command_skips_pages_with_local_cache(self):
+        """С локальным кешем команда только компилирует шаблоны"""
+        out = StringIO()
+        call_command("warm_up", stdout=out)
+        self.assertIn("страницы не запрашивались", out.getvalue())
+        self.assertIn("страниц: 0", out.getvalue())
+
+    @override_settings(WARMUP_ON_START=True)
+    def test_wsgi_entrypoint_warms_up(self):
+        """При WARMUP_ON_START прогрев выполняется при загрузке wsgi.py"""
+        # django.setup() из wsgi.py заново настраивает журналы, поэтому
+        # вместо assertLogs подменяется сам логгер.
+        with mock.patch.object(connections, "close_all") as close_all:
+            with mock.patch("core.warmup.logger") as logger:
+                importlib.reload(importlib.import_module("yatube.wsgi"))
+        close_all.assert_called_with()
+        self.assertIn("Прогрев", logger.info.call_args[0][0])
+        self.assert_served_from_cache("index")
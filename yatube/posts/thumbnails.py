@@ -0,0 +1,167 @@
+"""Фоновая генерация миниатюр картинок постов.
+
+Для каждой картинки строится набор миниатюр разной ширины (RENDITIONS)
+для srcset. Они строятся сразу после сохранения поста в пуле потоков
+(после нормализации картинки, см. images.py), поэтому первый просмотр
+страницы не платит за декодирование, масштабирование и кодирование.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile, deserialize_image_file
+from sorl.thumbnail.kvstores.base import add_prefix
+from sorl.thumbnail.kvstores.cached_db_kvstore import (
+    EMPTY_VALUE,
+    KVStore as CachedDbKVStore,
+)
+from sorl.thumbnail.models import KVStore as KVStoreModel
+
+logger = logging.getLogger(__name__)
+
+# Должны совпадать с тегом {% thumbnail %} в шаблонах постов.
+GEOMETRY = "960x339"
+OPTIONS = {"padding": True, "upscale": True}
+# Ширины миниатюр для srcset; пропорции те же, что у GEOMETRY.
+WIDTHS = (320, 640, 960)
+
+
+def geometry(width):
+    full_width, full_height = map(int, GEOMETRY.split("x"))
+    return f"{width}x{round(width * full_height / full_width)}"
+
+
+RENDITIONS = tuple(geometry(width) for width in WIDTHS)
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            thread_name_prefix="thumbnails",
+        )
+    return _executor
+
+
+def _source(image):
+    """Исходник для sorl в хранилище загрузок, как у поля Post.image.
+
+    Хранилище входит в ключ миниатюры, а у sorl своё (THUMBNAIL_STORAGE).
+    """
+    if isinstance(image, str):
+        return ImageFile(image, default_storage)
+    return ImageFile(image)
+
+
+def pregenerate(name):
+    """Строит миниатюры всех ширин файла name; True при успехе."""
+    try:
+        for size in RENDITIONS:
+            get_thumbnail(_source(name), size, **OPTIONS)
+        return True
+    except Exception:
+        logger.exception("Не удалось построить миниатюру %s", name)
+        return False
+
+
+def pregenerate_in_worker(name):
+    """pregenerate для потока пула: закрывает своё соединение с БД."""
+    try:
+        return pregenerate(name)
+    finally:
+        connection.close()
+
+
+def _thumbnail_file(image, size=GEOMETRY):
+    """Файл миниатюры, который построил бы get_thumbnail для image.
+
+    Повторяет сборку опций из ThumbnailBackend.get_thumbnail, чтобы
+    получить то же имя файла и тот же ключ в хранилище sorl.
+    """
+    backend = default.backend
+    source = _source(image)
+    options = dict(OPTIONS)
+    if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+        options.setdefault("format", backend._get_format(source))
+    for key, value in backend.default_options.items():
+        options.setdefault(key, value)
+    for key, attr in backend.extra_options:
+        value = getattr(sorl_settings, attr)
+        if value != getattr(sorl_defaults, attr):
+            options.setdefault(key, value)
+    name = backend._get_thumbnail_filename(source, size, options)
+    return ImageFile(name, default.storage)
+
+
+def _get_many_raw(keys):
+    """Сырые значения хранилища sorl: get_many к кешу и один SELECT."""
+    kvstore = default.kvstore
+    if not isinstance(kvstore, CachedDbKVStore):
+        return {key: kvstore._get_raw(key) for key in keys}
+    found = kvstore.cache.get_many(keys)
+    missing = [key for key in keys if key not in found]
+    if missing:
+        rows = dict(
+            KVStoreModel.objects.filter(key__in=missing).values_list(
+                "key", "value"
+            )
+        )
+        kvstore.cache.set_many(rows, sorl_settings.THUMBNAIL_CACHE_TIMEOUT)
+        found.update(rows)
+    return {
+        key: value for key, value in found.items() if value != EMPTY_VALUE
+    }
+
+
+def _keys(image):
+    return [
+        add_prefix(_thumbnail_file(image, size).key) for size in RENDITIONS
+    ]
+
+
+def missing(names):
+    """Имена картинок, у которых построены не все миниатюры."""
+    keys = {name: _keys(name) for name in names}
+    found = _get_many_raw([key for row in keys.values() for key in row])
+    return [
+        name
+        for name, row in keys.items()
+        if not all(key in found for key in row)
+    ]
+
+
+def prefetch(posts):
+    """Проставляет миниатюры всем постам страницы с картинкой.
+
+    post.renditions - миниатюры всех ширин по возрастанию,
+    post.thumbnail - самая широкая. Метаданные готовых миниатюр
+    читаются пачкой, по одной строятся только ещё не созданные.
+    """
+    posts = [post for post in posts if post.image]
+    keys = {post.pk: _keys(post.image) for post in posts}
+    values = _get_many_raw(
+        list({key for row in keys.values() for key in row})
+    )
+    for post in posts:
+        renditions = []
+        for size, key in zip(RENDITIONS, keys[post.pk]):
+            value = values.get(key)
+            if value:
+                rendition = deserialize_image_file(value)
+            else:
+                rendition = get_thumbnail(post.image, size, **OPTIONS)
+            renditions.append(rendition)
+        post.thumbnail = renditions[-1]
+        # Без исходного файла sorl отдаёт миниатюры без размеров:
+        # для srcset они не годятся.
+        post.renditions = (
+            renditions if all(im.size for im in renditions) else []
+        )
@@ -0,0 +1,110 @@
+"""Поддержка материализованной ленты подписок (fan-out on write)."""
+from django.db import transaction
+
+from .models import Follow, Post, TimelineEntry
+
+BATCH_SIZE = 500
+
+
+def _bulk_insert(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out_post(post):
+    """Кладёт новый пост в ленты всех подписчиков автора."""
+    followers = Follow.objects.filter(author_id=post.author_id).values_list(
+        "user_id", flat=True
+    )
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post.pk,
+            author_id=post.author_id,
+            pub_date=post.pub_date,
+        )
+        for user_id in followers.iterator()
+    )
+
+
+def fan_out(posts):
+    """Кладёт пачку новых постов в ленты подписчиков их авторов.
+
+    posts - тройки (id, id автора, дата); подписки читаются одним
+    запросом на всю пачку.
+    """
+    followers = {}
+    for author_id, user_id in Follow.objects.filter(
+        author_id__in={author_id for _, author_id, _ in posts}
+    ).values_list("author_id", "user_id"):
+        followers.setdefault(author_id, []).append(user_id)
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, author_id, pub_date in posts
+        for user_id in followers.get(author_id, ())
+    )
+
+
+def backfill(user_id, author_id):
+    """Добавляет в ленту читателя все посты автора после подписки."""
+    posts = Post.objects.filter(author_id=author_id).values_list(
+        "pk", "pub_date"
+    )
+    _bulk_insert(
+        TimelineEntry(
+            user_id=user_id,
+            post_id=post_id,
+            author_id=author_id,
+            pub_date=pub_date,
+        )
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def prune(user_id, author_id):
+    """Убирает посты автора из ленты читателя после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def rebuild(user_id):
+    """Пересобирает ленту читателя с нуля по таблице подписок."""
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        authors = Follow.objects.filter(user_id=user_id).values_list(
+            "author_id", flat=True
+        )
+        for author_id in authors:
+            backfill(user_id, author_id)
+
+
+def timeline_users():
+    """Все читатели, у которых есть подписки или записи в ленте."""
+    followers = Follow.objects.values_list("user_id", flat=True)
+    readers = TimelineEntry.objects.values_list("user_id", flat=True)
+    return sorted(set(followers.distinct()) | set(readers.distinct()))
+
+
+def check(user_id):
+    """Сверяет ленту с подписками.
+
+    Возвращает пару множеств id постов: недостающие и лишние.
+    """
+    expected = set(
+        Post.objects.filter(author__following__user_id=user_id).values_list(
+            "pk", "author_id", "pub_date"
+        )
+    )
+    actual = set(
+        TimelineEntry.objects.filter(user_id=user_id).values_list(
+            "post_id", "author_id", "pub_date"
+        )
+    )
+    missing = {row[0] for row in expected - actual}
+    stale = {row[0] for row in actual - expected}
+    return missing, stale
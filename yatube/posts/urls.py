@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, views
 
 app_name = "posts"
 
@@ -13,6 +13,8 @@ urlpatterns = [
     path("profile/<str:username>/", views.profile, name="profile"),
     # Просмотр записи
     path("posts/<int:post_id>/", views.post_detail, name="post_detail"),
+    # Поиск по постам
+    path("search/", views.search, name="search"),
     # Create post
     path("create/", views.post_create, name="post_create"),
     # Delete post
@@ -25,6 +27,12 @@ urlpatterns = [
         views.add_comment,
         name="add_comment",
     ),
+    # Следующие комментарии к записи
+    path(
+        "posts/<int:post_id>/comments/",
+        views.post_comments,
+        name="post_comments",
+    ),
     # Подписка и отписка
     path("follow/", views.follow_index, name="follow_index"),
     path(
@@ -37,4 +45,28 @@ urlpatterns = [
         views.profile_unfollow,
         name="profile_unfollow",
     ),
+    # Выгрузка данных для аналитики (только для персонала)
+    path("export/<slug:table>/", views.export_data, name="export_data"),
+    # JSON-лента для клиентов
+    path("api/posts/", api.index, name="api_index"),
+    path(
+        "api/posts/<int:post_id>/",
+        api.post_detail,
+        name="api_post_detail",
+    ),
+    path("api/group/<slug:slug>/", api.group_posts, name="api_group_list"),
+    path(
+        "api/profile/<str:username>/", api.profile, name="api_profile"
+    ),
+    path("api/follow/", api.follow_index, name="api_follow_index"),
+    path(
+        "api/profile/<str:username>/follow/",
+        api.profile_follow,
+        name="api_follow",
+    ),
+    path(
+        "api/profile/<str:username>/unfollow/",
+        api.profile_unfollow,
+        name="api_unfollow",
+    ),
 ]
@@ -1,25 +1,64 @@
-from django.core.paginator import Paginator
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import (
+    Http404,
+    HttpResponseBadRequest,
+    JsonResponse,
+    StreamingHttpResponse,
+)
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect
 from django.conf import settings
-from django.views.decorators.cache import cache_page
 
-from .models import Follow, Post, Group, User
+from core.cache import (
+    conditional_page,
+    get_generations,
+    versioned_cache_page,
+)
+from core.db import read_from_replica
+from core.paginator import CachedCountPaginator, CursorPaginator
+from .cache import (
+    group_scopes,
+    index_scopes,
+    post_detail_scopes,
+    profile_scopes,
+)
+from .models import Comment, Follow, Post, Group, TimelineEntry, User
 from .forms import PostForm, CommentForm
+from . import comment_buffer, export, follows, thumbnails
+from .search import SearchPaginator, search_posts
 
 
-def pagination_function(request, object):
-    paginator = Paginator(object, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get("page")
-    result = paginator.get_page(page_number)
-    return result
+def pagination_function(
+    request, object, keys=("pub_date", "pk"), feed=None, scopes=()
+):
+    # Старые ссылки вида ?page=N продолжают работать через OFFSET,
+    # всё остальное листается курсором без COUNT(*).
+    if "page" in request.GET:
+        # Число постов ленты кешируется под её именем и поколениями
+        # областей, так что новый пост сразу даёт новый ключ.
+        count_key = feed and ".".join(
+            [feed] + [str(value) for value in get_generations(scopes)]
+        )
+        paginator = CachedCountPaginator(
+            object, settings.POSTS_PER_PAGE, count_key=count_key
+        )
+        page_number = request.GET.get("page")
+        return paginator.get_page(page_number)
+    paginator = CursorPaginator(object, settings.POSTS_PER_PAGE, keys=keys)
+    return paginator.get_cursor_page(request.GET.get("cursor"))
 
 
-@cache_page(settings.TIME_OF_CACHE, key_prefix="index_page")
+@conditional_page(index_scopes)
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, index_scopes, key_prefix="index_page"
+)
+@read_from_replica(index_scopes)
 def index(request):
-    post_list = Post.objects.all()
-    page_obj = pagination_function(request, post_list)
+    post_list = Post.objects.select_related("author", "group")
+    page_obj = pagination_function(
+        request, post_list, feed="index", scopes=index_scopes(request)
+    )
     context = {
         "page_obj": page_obj,
         "index": True,
@@ -28,10 +67,20 @@ def index(request):
     return render(request, template, context)
 
 
+@conditional_page(group_scopes)
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, group_scopes, key_prefix="group_page"
+)
+@read_from_replica(group_scopes)
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
-    page_obj = pagination_function(request, posts)
+    posts = group.posts.select_related("author", "group")
+    page_obj = pagination_function(
+        request,
+        posts,
+        feed=f"group:{slug}",
+        scopes=group_scopes(request, slug),
+    )
     context = {
         "group": group,
         "page_obj": page_obj,
@@ -41,10 +90,22 @@ def group_posts(request, slug):
     return render(request, template, context)
 
 
+@conditional_page(profile_scopes)
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, profile_scopes, key_prefix="profile_page"
+)
+@read_from_replica(profile_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    page_obj = pagination_function(request, posts)
+    author = get_object_or_404(
+        User.objects.select_related("stats"), username=username
+    )
+    posts = author.posts.select_related("author", "group")
+    page_obj = pagination_function(
+        request,
+        posts,
+        feed=f"author:{username}",
+        scopes=profile_scopes(request, username),
+    )
     context = {
         "author": author,
         "page_obj": page_obj,
@@ -55,17 +116,82 @@ def profile(request, username):
     return render(request, template, context)
 
 
+def comments_page(post_id, cursor=None):
+    # Комментарии идут от старых к новым, курсор указывает на последний
+    # показанный.
+    comments = Comment.objects.filter(post_id=post_id).select_related(
+        "author"
+    )
+    paginator = CursorPaginator(
+        comments, settings.COMMENTS_PER_PAGE, descending=False
+    )
+    return paginator.get_cursor_page(cursor)
+
+
+@conditional_page(post_detail_scopes)
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, post_detail_scopes, key_prefix="post_page"
+)
+@read_from_replica(post_detail_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, id=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related("author__stats", "group"), id=post_id
+    )
+    thumbnails.prefetch([post])
     context = {
         "post": post,
         "form": CommentForm(),
-        "comments": post.comments.all(),
+        "comments": comments_page(post.pk),
     }
     template = "posts/post_detail.html"
     return render(request, template, context)
 
 
+@versioned_cache_page(
+    settings.TIME_OF_CACHE, post_detail_scopes, key_prefix="post_comments"
+)
+@read_from_replica(post_detail_scopes)
+def post_comments(request, post_id):
+    # Следующая пачка комментариев для кнопки "Показать ещё":
+    # HTML-фрагмент или JSON при ?format=json.
+    get_object_or_404(Post.objects.only("pk"), id=post_id)
+    comments = comments_page(post_id, request.GET.get("after"))
+    next_cursor = comments.paginator.next_cursor
+    if request.GET.get("format") == "json":
+        return JsonResponse(
+            {
+                "comments": [
+                    {
+                        "id": comment.pk,
+                        "author": comment.author.username,
+                        "text": comment.text,
+                        "pub_date": comment.pub_date.isoformat(),
+                    }
+                    for comment in comments
+                ],
+                "next": next_cursor,
+            },
+            json_dumps_params={"ensure_ascii": False},
+        )
+    context = {
+        "post_id": post_id,
+        "comments": comments,
+    }
+    return render(request, "posts/includes/comment_list.html", context)
+
+
+@read_from_replica()
+def search(request):
+    query = request.GET.get("q", "").strip()
+    paginator = SearchPaginator(search_posts(query), settings.POSTS_PER_PAGE)
+    page_obj = paginator.get_cursor_page(request.GET.get("cursor"))
+    context = {
+        "page_obj": page_obj,
+        "query": query,
+    }
+    return render(request, "posts/search.html", context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(
@@ -73,9 +199,8 @@ def post_create(request):
         files=request.FILES or None,
     )
     if form.is_valid():
-        new_post = form.save(commit=False)
-        new_post.author = request.user
-        new_post.save()
+        form.instance.author = request.user
+        form.save()
         return redirect("posts:profile", request.user.username)
     context = {
         "form": form,
@@ -117,15 +242,29 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        comment_buffer.save_comment(comment)
     return redirect("posts:post_detail", post_id=post_id)
 
 
 @login_required
+@read_from_replica()
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
+    # Лента читается из материализованной таблицы диапазоном по индексу
+    # (user, pub_date), без JOIN с подписками.
+    entries = TimelineEntry.objects.filter(user=request.user).select_related(
+        "post__author", "post__group"
+    )
+    # У ленты подписок нет своей области кеша: число постов в ней
+    # устаревает не дольше чем на PAGINATOR_COUNT_TIMEOUT.
+    page_obj = pagination_function(
+        request,
+        entries,
+        keys=("pub_date", "post_id"),
+        feed=f"follow:{request.user.pk}",
+    )
+    page_obj.object_list = [entry.post for entry in page_obj.object_list]
     context = {
-        "page_obj": pagination_function(request, posts),
+        "page_obj": page_obj,
         "follow": True,
     }
     return render(request, "posts/follow.html", context)
@@ -148,10 +287,33 @@ def profile_follow(request, username):
 def profile_unfollow(request, username):
     # Дизлайк, отписка
     author = get_object_or_404(User, username=username)
-    unsubscribe_author = Follow.objects.filter(
-        user=request.user,
-        author=author,
-    )
-    if unsubscribe_author.exists():
-        unsubscribe_author.delete()
+    # Один DELETE без предварительного SELECT (см. follows.unfollow).
+    follows.unfollow(request.user, author)
     return redirect("posts:follow_index")
+
+
+@staff_member_required
+def export_data(request, table):
+    # Выгрузка для аналитики: строки уходят клиенту по мере чтения.
+    if table not in export.TABLES:
+        raise Http404
+    export_format = request.GET.get("format", "ndjson")
+    if export_format not in export.FORMATS:
+        return HttpResponseBadRequest("Неизвестный формат")
+    lines = export.export_lines(table, export_format)
+    filename = f"{table}.{export_format}"
+    if request.GET.get("gzip") == "1":
+        response = StreamingHttpResponse(
+            export.gzip_chunks(lines), content_type="application/gzip"
+        )
+        filename += ".gz"
+    else:
+        content_type = (
+            "text/csv" if export_format == "csv" else "application/x-ndjson"
+        )
+        response = StreamingHttpResponse(
+            export.buffered(lines),
+            content_type=f"{content_type}; charset=utf-8",
+        )
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
@@ -54,6 +54,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    # Server-Timing и строка журнала для доли запросов
+    "core.timing.ServerTimingMiddleware",
+    # Закрепление клиента за основной базой после записи
+    "core.db.PrimaryPinMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -104,6 +108,21 @@ DATABASES = {
     }
 }
 
+# Реплика для чтения лент (core.db). Локально это второй файл SQLite,
+# который обновляет команда sync_replica.
+if os.environ.get("YATUBE_REPLICA_DB"):
+    DATABASES["replica"] = {
+        "ENGINE": "django.db.backends.sqlite3",
+        "NAME": os.environ["YATUBE_REPLICA_DB"],
+        "TEST": {"MIRROR": "default"},
+    }
+
+DATABASE_ROUTERS = ["core.db.ReplicaRouter"]
+
+# Сколько секунд после записи клиент и изменённые страницы читают
+# из основной базы: должно быть больше отставания реплики.
+REPLICA_STICKY_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -143,6 +162,9 @@ USE_TZ = True
 
 STATIC_URL = "/static/"
 STATICFILES_DIRS = [os.path.join(BASE_DIR, "static")]
+# Куда collectstatic собирает статику с хешем содержимого в именах
+STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
+STATICFILES_STORAGE = "core.storage.HashedStaticStorage"
 
 # Это адрес, на который Django будет перенаправлять
 # пользователей для авторизации.
@@ -162,19 +184,96 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 # константа для указания количества постов на странице
 POSTS_PER_PAGE = 10
 
+# Сколько секунд хранится число постов ленты для ссылок ?page=N
+PAGINATOR_COUNT_TIMEOUT = 60 * 5
+# С какого размера таблицы вместо COUNT(*) берётся оценка СУБД
+APPROXIMATE_COUNT_THRESHOLD = 100000
+
+# Комментариев под постом сразу и за одно нажатие "Показать ещё"
+COMMENTS_PER_PAGE = 20
+
+# Буферизованная запись комментариев (posts.comment_buffer): размер
+# очереди процесса (0 - писать каждый комментарий сразу), размер пачки
+# и наибольшая задержка записи в миллисекундах.
+COMMENT_BUFFER_CAPACITY = 0
+COMMENT_BUFFER_BATCH = 100
+COMMENT_BUFFER_FLUSH_MS = 200
+
 # Имя view-функции, обрабатывающей ошибку 403
 CSRF_FAILURE_VIEW = "core.views.csrf_failure"
 
 # Полный путь к директории, куда будут загружаться файлы пользователей
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
+# Загрузки сохраняются с хешем содержимого в имени (core.storage).
+DEFAULT_FILE_STORAGE = "core.storage.HashedMediaStorage"
+# Имена миниатюр sorl и так строятся из имени исходника и опций.
+THUMBNAIL_STORAGE = "django.core.files.storage.FileSystemStorage"
+
+# Отдача файлов веб-сервером (core.files): None - отдаёт Django,
+# "x-accel-redirect" - nginx, "x-sendfile" - Apache или lighttpd.
+FILE_OFFLOAD = None
+# Внутренние location nginx, в которые ведёт X-Accel-Redirect
+FILE_OFFLOAD_PREFIXES = {
+    "static": "/protected/static/",
+    "media": "/protected/media/",
+}
 
 TEXT_SLICE = 15
 
+LOCAL_CACHE_BACKEND = "django.core.cache.backends.locmem.LocMemCache"
+# Общий для всех воркеров кеш задаётся переменными окружения, например
+# YATUBE_CACHE_BACKEND=django.core.cache.backends.db.DatabaseCache
+# и YATUBE_CACHE_LOCATION=cache_table (после manage.py createcachetable).
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "BACKEND": os.environ.get("YATUBE_CACHE_BACKEND", LOCAL_CACHE_BACKEND),
+        "LOCATION": os.environ.get("YATUBE_CACHE_LOCATION", ""),
     }
 }
-
-TIME_OF_CACHE = 20
+# Счётчики поколений (core.cache) лежат в этом же кеше. LocMemCache
+# у каждого процесса свой: запись в одном воркере не сдвигает поколения
+# в остальных, и они отдают старую страницу до истечения её срока.
+SHARED_CACHE = CACHES["default"]["BACKEND"] not in (
+    LOCAL_CACHE_BACKEND,
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+# С общим кешем страницы инвалидируются по поколениям данных и могут
+# жить часами; с локальным срок короткий, как и был.
+TIME_OF_CACHE = 60 * 60 * 6 if SHARED_CACHE else 20
+
+# Потоков для фоновой генерации миниатюр (0 - строить сразу после записи)
+THUMBNAIL_WORKERS = 2
+
+# Нормализация загруженных картинок (posts.images): наибольшая сторона
+# в пикселях, формат и качество перекодирования.
+IMAGE_MAX_SIZE = 2048
+IMAGE_FORMAT = "WEBP"
+IMAGE_QUALITY = 80
+
+# Доля запросов с заголовком Server-Timing и записью в журнал core.timing;
+# задаётся переменной окружения YATUBE_SERVER_TIMING_RATE, по умолчанию
+# замеры выключены.
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.environ.get("YATUBE_SERVER_TIMING_RATE", 0)
+)
+
+# Прогрев воркера при запуске из yatube/wsgi.py (core.warmup): включается
+# переменной окружения YATUBE_WARMUP=1.
+WARMUP_ON_START = os.environ.get("YATUBE_WARMUP") == "1"
+# Функция, возвращающая адреса страниц для прогрева кеша
+WARMUP_URLS = "posts.cache.warm_up_urls"
+# Host, с которым приходят запросы клиентов: он входит в ключ кеша
+WARMUP_HOST = "127.0.0.1:8000"
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "core": {"handlers": ["console"], "level": "INFO"},
+    },
+}
@@ -14,10 +14,11 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.conf import settings
-from django.conf.urls.static import static
 from django.contrib import admin
 from django.urls import include, path
 
+from core import files
+
 
 urlpatterns = [
     path("", include("posts.urls", namespace="posts")),
@@ -37,13 +38,12 @@ handler404 = "core.views.page_not_found"
 handler500 = "core.views.server_error"
 handler403 = "core.views.permission_denied"
 
-# Эта колдограмма будет работать, когда ваш сайт в режиме отладки.
-# Он позволяет обращаться к файлам в директории, указанной в MEDIA_ROOT
-# по имени, через префикс MEDIA_URL.
+# Статика из STATIC_ROOT и загрузки из MEDIA_ROOT с заголовками
+# долгого кеширования; перед приложением их может отдавать веб-сервер
+# по X-Accel-Redirect или X-Sendfile (FILE_OFFLOAD).
+urlpatterns += files.urlpatterns()
+
 if settings.DEBUG:
     import debug_toolbar
 
-    urlpatterns += static(
-        settings.MEDIA_URL, document_root=settings.MEDIA_ROOT
-    )
     urlpatterns += (path("__debug__/", include(debug_toolbar.urls)),)
@@ -9,8 +9,20 @@ https://docs.djangoproject.com/en/2.2/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
+from django.db import connections
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Прогрев только здесь, а не в AppConfig.ready: ready выполняют и migrate,
+# и остальные команды manage.py. Модуль импортирует каждый воркер
+# (у gunicorn без --preload), поэтому прогревается память каждого.
+if settings.WARMUP_ON_START:
+    from core.warmup import warm_up_on_start
+
+    warm_up_on_start(application)
+    # Соединения прогрева не должны достаться процессам после fork.
+    connections.close_all()